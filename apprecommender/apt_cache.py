@@ -1,23 +1,120 @@
 #!/usr/bin/env python
 
 import apt
-import xapian
+import logging
+import os
+import sqlite3
+import threading
 
+from apprecommender.config import Config
+from apprecommender.pkg_metadata import PkgMetadata
+from apprecommender.singleton import Singleton
+from apprecommender.xapian_index import XapianIndexManager
 
-class AptCache:
+
+class AptCache(Singleton):
+
+    """
+    Process wide view of the apt cache. The apt-xapian-index and apt.Cache
+    are only opened when first needed and the package fields used by the
+    recommender are memoized, so instances are cheap to create. Fields are
+    read from the compiled PkgMetadata when it is up to date.
+    """
 
     DEFAULT_AXI_PATH = "/var/lib/apt-xapian-index/index"
 
+    CANDIDATE_FIELDS = {
+        'summary': lambda candidate: candidate.summary,
+        'description': lambda candidate: candidate.description,
+        'section': lambda candidate: candidate.section,
+        'tags': lambda candidate: candidate.record.get('Tag', None),
+        'dependencies': lambda candidate: [
+            dep[0].name for dep in candidate.dependencies],
+        'or_dependencies': lambda candidate: [
+            or_dep.name for dep in candidate.dependencies
+            for or_dep in dep.or_dependencies]}
+
     def __init__(self):
-        self.axi = xapian.Database(AptCache.DEFAULT_AXI_PATH)
+        if not hasattr(self, 'initialized'):
+            self.lock = threading.RLock()
+            self.reset()
+            self.initialized = 1
+
+    def reset(self):
+        """
+        Drop the opened caches and memoized fields, so they are loaded again
+        on next use.
+        """
+        with self.lock:
+            if getattr(self, '_metadata', None):
+                self._metadata.close()
+
+            self._cache = None
+            self._metadata = None
+            self.metadata_loaded = False
+            self.sources_mtime = PkgMetadata.get_sources_mtime()
+            self.pkgs_info = {}
+
+    def reset_if_outdated(self):
+        """
+        Reset the cache if the apt lists or the dpkg status changed since it
+        was loaded.
+        """
+        if self.sources_mtime != PkgMetadata.get_sources_mtime():
+            self.reset()
+
+    @property
+    def axi(self):
+        return XapianIndexManager().get(AptCache.DEFAULT_AXI_PATH)
+
+    @property
+    def metadata(self):
+        with self.lock:
+            if not self.metadata_loaded:
+                self._metadata = PkgMetadata.get()
+                if self._metadata is None:
+                    self._metadata = self.rebuild_metadata()
+                self.metadata_loaded = True
 
-        self.cache = apt.Cache()
+        return self._metadata
+
+    def rebuild_metadata(self):
+        """
+        Compile the package metadata again if it is outdated, as the apt
+        cache has to be loaded anyway. Return None if it was never compiled.
+        """
+        db_path = Config().pkg_metadata
+        if not os.path.exists(db_path):
+            return None
+
+        logging.info("Rebuilding package metadata on %s" % db_path)
+        try:
+            PkgMetadata.build(self.cache, self.axi, db_path)
+        except (sqlite3.Error, OSError) as error:
+            logging.warning("Could not rebuild package metadata: %s" % error)
+            return None
+
+        return PkgMetadata.get(db_path)
+
+    @property
+    def cache(self):
+        with self.lock:
+            if self._cache is None:
+                self._cache = apt.Cache()
+
+        return self._cache
 
     def __getitem__(self, pkg_name):
         return self.get(pkg_name)
 
     def __contains__(self, pkg_name):
-        return self.xapian_has_pkg(pkg_name) and pkg_name in self.cache
+        pkg_info = self.get_pkg_info(pkg_name)
+
+        if 'in_cache' not in pkg_info:
+            pkg_info['in_cache'] = (self.xapian_has_pkg(pkg_name) and
+                                    pkg_name in self.cache)
+
+        return pkg_info['in_cache']
 
     def get(self, pkg_name):
         if self.xapian_has_pkg(pkg_name):
@@ -28,3 +125,66 @@ class AptCache:
     def xapian_has_pkg(self, pkg_name):
         term = 'XP' + pkg_name
         return self.axi.get_termfreq(term) > 0L
+
+    def get_pkg_info(self, pkg_name):
+        with self.lock:
+            if pkg_name not in self.pkgs_info:
+                if self.metadata:
+                    pkg_info = self.metadata.get_pkg_info(pkg_name)
+                else:
+                    pkg_info = {}
+                self.pkgs_info[pkg_name] = pkg_info
+
+            return self.pkgs_info[pkg_name]
+
+    def get_candidate(self, pkg_name):
+        if pkg_name not in self:
+            return None
+
+        return self.cache[pkg_name].candidate
+
+    def get_candidate_field(self, pkg_name, field):
+        pkg_info = self.get_pkg_info(pkg_name)
+
+        if field not in pkg_info:
+            candidate = self.get_candidate(pkg_name)
+
+            if candidate is None:
+                pkg_info[field] = None
+            else:
+                pkg_info[field] = AptCache.CANDIDATE_FIELDS[field](candidate)
+
+        return pkg_info[field]
+
+    def has_candidate(self, pkg_name):
+        pkg_info = self.get_pkg_info(pkg_name)
+
+        if 'has_candidate' not in pkg_info:
+            candidate = self.get_candidate(pkg_name)
+            pkg_info['has_candidate'] = candidate is not None
+
+        return pkg_info['has_candidate']
+
+    def get_summary(self, pkg_name):
+        return self.get_candidate_field(pkg_name, 'summary')
+
+    def get_description(self, pkg_name):
+        return self.get_candidate_field(pkg_name, 'description')
+
+    def get_section(self, pkg_name):
+        return self.get_candidate_field(pkg_name, 'section')
+
+    def get_tags(self, pkg_name):
+        return self.get_candidate_field(pkg_name, 'tags')
+
+    def get_dependencies(self, pkg_name):
+        """
+        Return the first alternative of every dependency of the package.
+        """
+        return self.get_candidate_field(pkg_name, 'dependencies') or []
+
+    def get_or_dependencies(self, pkg_name):
+        """
+        Return every alternative of every dependency of the package.
+        """
+        return self.get_candidate_field(pkg_name, 'or_dependencies') or []
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+import glob
+import gzip
+import logging
+import os
+import pickle
+import re
+
+from apprecommender.config import Config
+
+
+class AptHistoryIndex:
+
+    """
+    Persistent index of the packages installed with apt commands, read from
+    the apt history logs. Every log is tracked by inode with the offset
+    already parsed, so rotated logs are not parsed again and only the new
+    lines of the current log are read.
+    """
+
+    HISTORY_GLOB = '/var/log/apt/history.log*'
+    INDEX_FILE = 'apt_history_index.pickle'
+    HEAD_SIZE = 256
+
+    INSTALLED_PKGS_REGEX = re.compile(r'^Commandline:.+apt.+install\s(.+)')
+    NO_REMOVE_PKGS_REGEX = re.compile(r'--no-remove')
+    AUTOMATIC_REMOVE_REGEX = re.compile(r'APT::Get::AutomaticRemove=true')
+
+    def __init__(self, index_path=None, history_glob=None):
+        self.index_path = index_path or os.path.join(
+            Config().user_data_dir, AptHistoryIndex.INDEX_FILE)
+        self.history_glob = history_glob or AptHistoryIndex.HISTORY_GLOB
+        self.logs = self.load()
+
+    def load(self):
+        try:
+            with open(self.index_path, 'rb') as index_file:
+                return pickle.load(index_file)
+        except (IOError, EOFError, ValueError, pickle.UnpicklingError):
+            return {}
+
+    def save(self):
+        try:
+            with open(self.index_path, 'wb') as index_file:
+                pickle.dump(self.logs, index_file)
+        except (IOError, OSError):
+            logging.debug("Could not save apt history index on %s"
+                          % self.index_path)
+
+    def get_command_pkgs(self, line):
+        """
+        Return the packages installed by an apt history Commandline line.
+        """
+        if not line.startswith('Commandline:'):
+            return set()
+
+        installed_pkgs = AptHistoryIndex.INSTALLED_PKGS_REGEX.search(line)
+        no_remove_pkgs = AptHistoryIndex.NO_REMOVE_PKGS_REGEX.search(line)
+        automatic_remove_pkgs = AptHistoryIndex.AUTOMATIC_REMOVE_REGEX.search(
+            line)
+
+        if installed_pkgs and not no_remove_pkgs and not automatic_remove_pkgs:
+            return set(installed_pkgs.group(1).split())
+
+        return set()
+
+    def is_appended(self, log_path, log_stat, log):
+        if log is None or log_stat.st_size < log['offset']:
+            return False
+
+        with open(log_path, 'rb') as log_file:
+            return log_file.read(len(log['head'])) == log['head']
+
+    def update_log(self, log_path, log_stat, log):
+        is_gzip = log_path.endswith('.gz')
+
+        if log and (log['size'], log['mtime']) == (log_stat.st_size,
+                                                   log_stat.st_mtime):
+            return log
+
+        if is_gzip or not self.is_appended(log_path, log_stat, log):
+            log = {'offset': 0, 'head': '', 'pkgs': set()}
+        else:
+            log = dict(log, pkgs=set(log['pkgs']))
+
+        open_log = gzip.open if is_gzip else open
+        with open_log(log_path, 'rb') as log_file:
+            if not log['offset']:
+                log['head'] = log_file.read(AptHistoryIndex.HEAD_SIZE)
+                log_file.seek(0)
+            else:
+                log_file.seek(log['offset'])
+
+            for line in log_file:
+                log['pkgs'] |= self.get_command_pkgs(line.strip())
+
+                # an incomplete last line is parsed again on next update
+                if line.endswith('\n'):
+                    log['offset'] += len(line)
+
+        log['size'], log['mtime'] = log_stat.st_size, log_stat.st_mtime
+
+        return log
+
+    def update(self):
+        logs = {}
+
+        for log_path in glob.glob(self.history_glob):
+            try:
+                log_stat = os.stat(log_path)
+            except OSError:
+                continue
+
+            try:
+                logs[log_stat.st_ino] = self.update_log(
+                    log_path, log_stat, self.logs.get(log_stat.st_ino))
+            except IOError:
+                logging.warning("Could not read apt history log %s"
+                                % log_path)
+
+        changed = (set(logs) != set(self.logs) or
+                   any(logs[inode] is not self.logs[inode] for inode in logs))
+        self.logs = logs
+
+        if changed:
+            self.save()
+
+    def get_installed_pkgs(self):
+        self.update()
+
+        installed_pkgs = set()
+        for log in self.logs.itervalues():
+            installed_pkgs |= log['pkgs']
+
+        return installed_pkgs
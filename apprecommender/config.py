@@ -63,11 +63,18 @@ class Config(Singleton):
             # filters for valid packages
             self.filters_dir = os.path.join(self.base_dir, "filters")
             self.pkgs_filter = os.path.join(self.filters_dir, "desktopapps")
+            # unix socket used by the recommender daemon
+            self.daemon_socket = os.path.join(self.base_dir, "apprec.sock")
             # package information packages
             self.axi = "/var/lib/apt-xapian-index/index"
             self.axi_programs = os.path.join(self.base_dir, "axi_programs")
             self.axi_desktopapps = os.path.join(self.base_dir,
                                                 "axi_desktopapps")
+            self.term_matrix_dir = os.path.join(self.base_dir,
+                                                "axi_desktopapps_matrix")
+            self.pkg_metadata = os.path.join(self.base_dir, "pkg_metadata.db")
+            self.dependency_graph_dir = os.path.join(self.base_dir,
+                                                     "dependency_graph")
             # popcon indexes
             self.index_mode = "old"
             # check if there are popcon indexes available
@@ -100,6 +107,8 @@ class Config(Singleton):
             self.bm25_nl = 0.5
             # user content profile size
             self.profile_size = 10
+            # number of content profiles cached, 0 disables the cache
+            self.profile_cache_size = 64
             self.num_recommendations = 8
             self.because = False
             # neighborhood size
@@ -143,6 +152,9 @@ class Config(Singleton):
         self.pkgs_filter = os.path.join(
             self.filters_dir, self.read_option('data_sources',
                                                'pkgs_filter'))
+        self.daemon_socket = os.path.join(
+            self.base_dir, self.read_option('data_sources',
+                                            'daemon_socket'))
         self.axi = self.read_option('data_sources', 'axi')
         self.axi_programs = os.path.join(
             self.base_dir, self.read_option('data_sources',
@@ -150,6 +162,15 @@ class Config(Singleton):
         self.axi_desktopapps = os.path.join(
             self.base_dir, self.read_option('data_sources',
                                             'axi_desktopapps'))
+        self.term_matrix_dir = os.path.join(
+            self.base_dir, self.read_option('data_sources',
+                                            'term_matrix_dir'))
+        self.pkg_metadata = os.path.join(
+            self.base_dir, self.read_option('data_sources',
+                                            'pkg_metadata'))
+        self.dependency_graph_dir = os.path.join(
+            self.base_dir, self.read_option('data_sources',
+                                            'dependency_graph_dir'))
         # self.index_mode = self.read_option('data_sources', 'index_mode')
         self.popcon = int(self.read_option('data_sources', 'popcon'))
         self.popcon_programs = os.path.join(
@@ -182,6 +203,8 @@ class Config(Singleton):
         self.strategy = self.read_option('recommender', 'strategy')
         self.profile_size = int(
             self.read_option('recommender', 'profile_size'))
+        self.profile_cache_size = int(
+            self.read_option('recommender', 'profile_cache_size'))
         self.k_neighbors = int(
             self.read_option('recommender', 'k_neighbors'))
         self.popcon_profiling = self.read_option(
@@ -24,11 +24,15 @@ import logging
 import random
 import operator
 import math
-import commands
+
+import numpy as np
 
 from apprecommender.utils import print_progress_bar
-from apprecommender.data_classification import time_weight
+from apprecommender.data_classification import terms_time_weight
+from apprecommender.decider import FilterAny, PkgMatchFilter
+from apprecommender.dpkg_status import DpkgStatus
 from apprecommender.error import Error
+from apprecommender.term_matrix import PkgTermMatrix
 
 
 def axi_get_pkgs(axi):
@@ -81,109 +85,139 @@ def print_index(index):
 
 
 def get_user_installed_pkgs():
-    dpkg_output = commands.getoutput('/usr/bin/dpkg --get-selections')
+    return DpkgStatus().get_installed_pkgs()
 
-    packages = [pkg.split('\t')[0] for pkg in dpkg_output.splitlines()
-                if 'deinstall' not in pkg.split('\t')[-1]]
 
-    packages = set(packages)
+def get_doc_terms(index, matrix, docid):
+    if matrix:
+        return matrix.get_pkg(docid), matrix.get_doc_terms(docid)
 
-    return packages
+    doc = index.get_document(docid)
+    return doc.get_data(), [term.term for term in doc.termlist()]
 
 
 def get_all_terms(index, docs, content_filter, normalized_weights):
-    # Store all terms in one single document
+    # Sum the wdf of all terms as if they were in one single document
 
     terms_packages = {}
-    terms_doc = xapian.Document()
+    terms_wdf = {}
+    matrix = PkgTermMatrix.get(index)
 
     for d in docs:
 
-        package = d.document.get_data()
+        package, doc_terms = get_doc_terms(index, matrix, d.docid)
 
-        for term in index.get_document(d.docid).termlist():
+        if normalized_weights:
+            wdf = int(math.ceil(normalized_weights[d.docid]))
+        else:
+            wdf = 1
 
-            if content_filter(term.term):
-                if normalized_weights:
-                    terms_doc.add_term(term.term,
-                                       int(math.ceil(
-                                           normalized_weights[d.docid])))
-                else:
-                    terms_doc.add_term(term.term)
+        for term in doc_terms:
 
-            if term.term.startswith('XP'):
+            if content_filter(term):
+                terms_wdf[term] = terms_wdf.get(term, 0) + wdf
+
+            if term.startswith('XP'):
                 continue
-            elif term.term in terms_packages:
-                terms_packages[term.term].append(package)
+            elif term in terms_packages:
+                terms_packages[term].append(package)
             else:
-                terms_packages[term.term] = [package]
+                terms_packages[term] = [package]
 
-    return (terms_doc, terms_packages)
+    return (terms_wdf, terms_packages)
 
 
-def get_tfidf_terms_weights(terms_doc, index, terms_package, time_context=0):
+def get_tfidf_terms_weights(terms_wdf, index, terms_package, time_context=0):
 
     # Compute sublinear tfidf for each term
     weights = {}
-    for term in terms_doc.termlist():
+    for term, wdf in terms_wdf.iteritems():
         try:
             # Even if it shouldn't raise error...
             # math.log: ValueError: math domain error
-            tf = 1 + math.log(term.wdf)
+            tf = 1 + math.log(wdf)
             idf = math.log(index.get_doccount() /
-                           float(index.get_termfreq(term.term)))
+                           float(index.get_termfreq(term)))
 
             tfidf = tf * idf
-            weights[term.term] = tfidf
-
-            if time_context:
-                weight = time_weight(term.term,
-                                     terms_package[term.term])
-                weights[term.term] *= weight
+            weights[term] = tfidf
         except:
             pass
 
+    if time_context:
+        terms = [term for term in weights if term in terms_package]
+        for term, weight in zip(terms, terms_time_weight(terms,
+                                                         terms_package)):
+            weights[term] *= weight
+
     # print_best_weight_terms(terms_package)
 
     return weights
 
 
 def tfidf_weighting(index, docs, content_filter, normalized_weights=0,
-                    time_context=0):
+                    time_context=0, limit=0):
+    """
+    Return a list of terms and weights of all terms of a set of documents,
+    sorted by weight and based on the frequency of terms in the selected set
+    (docids). If limit is set, only the best limit terms are returned.
+    """
+    return tfidf_weighting_by_filter(index, docs, {None: content_filter},
+                                     normalized_weights, time_context,
+                                     limit)[None]
+
+
+def tfidf_weighting_by_filter(index, docs, content_filters,
+                              normalized_weights=0, time_context=0, limit=0):
     """
-    Return a dictionary of terms and weights of all terms of a set of
-    documents, based on the frequency of terms in the selected set (docids).
+    Return a dict with the tfidf_weighting of every filter of content_filters.
+    The documents are traversed and the terms are weighted only once, since
+    the weight of a term does not depend on the filter that selected it.
     """
+    content_filter = FilterAny(content_filters)
 
-    terms_doc, terms_packages = get_all_terms(index, docs, content_filter,
+    matrix = PkgTermMatrix.get(index)
+    if matrix:
+        return matrix.tfidf_weighting_by_filter(docs, content_filter,
+                                                normalized_weights,
+                                                time_context, limit)
+
+    terms_wdf, terms_packages = get_all_terms(index, docs, content_filter,
                                               normalized_weights)
-    weights = get_tfidf_terms_weights(terms_doc, index, terms_packages,
+    weights = get_tfidf_terms_weights(terms_wdf, index, terms_packages,
                                       time_context)
 
     sorted_weights = list(reversed(sorted(weights.items(),
                                           key=operator.itemgetter(1))))
-    return sorted_weights
+
+    filters_weights = {}
+    for name in content_filters:
+        filter_weights = [(term, weight) for term, weight in sorted_weights
+                          if name in content_filter.get_filters(term)]
+        if limit:
+            filter_weights = filter_weights[:limit]
+        filters_weights[name] = filter_weights
+
+    return filters_weights
 
 
-def tfidf_plus(index, docs, content_filter, time_context=0):
+def tfidf_plus(index, docs, content_filter, time_context=0, limit=0):
     """
-    Return a dictionary of terms and weights of all terms of a set of
-    documents, based on the frequency of terms in the selected set (docids).
+    Return a list of terms and weights of all terms of a set of documents,
+    sorted by weight and based on the frequency of terms in the selected set
+    (docids).
     """
-    normalized_weigths = {}
-    population = [d.weight for d in docs]
-    mean = sum(population) / len(population)
-    variance = sum([(p - mean) * (p - mean)
-                   for p in population]) / len(population)
-    standard_deviation = math.sqrt(variance)
-    for d in docs:
-        if standard_deviation > 1:
-            # values between [0-1] would cause the opposite effect
-            normalized_weigths[d.docid] = d.weight / standard_deviation
-        else:
-            normalized_weigths[d.docid] = d.weight
+    docids = [d.docid for d in docs]
+    population = np.array([d.weight for d in docs], dtype=float)
+    standard_deviation = population.std()
+
+    # values between [0-1] would cause the opposite effect
+    if standard_deviation > 1:
+        population /= standard_deviation
+
+    normalized_weigths = dict(zip(docids, population))
     return tfidf_weighting(index, docs, content_filter, normalized_weigths,
-                           time_context)
+                           time_context, limit)
 
 
 def split_pkg_data(user_pkg, partition_size):
@@ -250,9 +284,15 @@ class SampleAptXapianIndex(xapian.WritableDatabase):
         len_sample = len(self.sample)
 
         for index, package in enumerate(self.sample):
-            self.doc_id = self.add_document(axi.get_document(package.docid))
+            doc = axi.get_document(package.docid)
+            for term in PkgMatchFilter.get_document_terms(doc.get_data()):
+                doc.add_boolean_term(term)
+
+            self.doc_id = self.add_document(doc)
             print_progress_bar(index + 1, len_sample)
 
+        self.set_metadata(PkgMatchFilter.METADATA_KEY, '1')
+
     def __str__(self):
         return print_index(self)
 
@@ -1,14 +1,16 @@
 #!/usr/bin/env python
 
-import commands
 import calendar
 import logging
 import math
 import operator
 import time
 
-pkgs_times = {}
-pkgs_time_weight = {}
+import numpy as np
+
+from apprecommender.file_time import FileTimeService
+from apprecommender.pkg_files import PkgFilesIndex
+
 best_weight_terms = {}
 user_tfidf_weights = {}
 
@@ -19,26 +21,17 @@ def pkg_name_with_error(pkg):
 
 def get_time_from_package(pkg, pkg_bin=True):
     if pkg_name_with_error(pkg):
-        pkgs_times[pkg] = [None, None]
-
-    if pkg in pkgs_times:
-        modify, access = pkgs_times[pkg]
-    else:
-        modify = get_time('Y', pkg, pkg_bin)
-        access = get_time('X', pkg, pkg_bin)
-        pkgs_times[pkg] = [modify, access]
+        return [None, None]
 
-    return pkgs_times[pkg]
+    return list(FileTimeService().get_times(pkg, is_binary=pkg_bin))
 
 
 def get_alternative_pkg(pkg):
-    dpkg_command = "dpkg -L {0}| grep /usr/bin/"
-    dpkg_command += " || dpkg -L {0}| grep /usr/sbin/"
-    pkg_bin = commands.getoutput(dpkg_command.format(pkg))
+    pkg_bin = PkgFilesIndex().get_binaries(pkg)
 
     possible_pkgs = {}
-    for pkg_path in pkg_bin.splitlines():
-        possible_pkgs[pkg_path] = get_time('X', pkg_path)
+    for pkg_path in pkg_bin:
+        possible_pkgs[pkg_path] = get_time_from_package(pkg_path)[1]
 
     if bool(possible_pkgs):
         return sorted(possible_pkgs.items(), key=operator.itemgetter(1))[0][0]
@@ -46,79 +39,137 @@ def get_alternative_pkg(pkg):
     return None
 
 
-def get_time(option, pkg, pkg_bin=True):
-    stat_base = "stat -c '%{option}'"
-    stat_base += " `which {package}`" if pkg_bin else " {package}"
-    stat_error = 'stat:'
-    stat_time = stat_base.format(option=option, package=pkg)
-
-    pkg_time = commands.getoutput(stat_time)
-
-    if stat_error not in pkg_time:
-        return pkg_time
-
-    return None
-
-
 def linear_percent_function(modify, access, time_now):
-    modify, access = int(modify), int(access)
+    modify = np.asarray(modify, dtype=float)
+    access = np.asarray(access, dtype=float)
 
     time_access = access - modify
     time_actual = time_now - modify
 
-    percent = float(time_access) / float(time_actual)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percent = time_access / time_actual
 
     return percent
 
 
-def get_pkg_time_weight(pkg):
+def get_pkg_times(pkg):
+    """
+    Return the modify and access times of the package binary, or of its
+    alternative binary, or NaN if none of them can be found.
+    """
     modify, access = get_time_from_package(pkg)
 
     if not modify and not access:
-        modify, access = get_time_from_package(get_alternative_pkg(pkg))
+        alternative_pkg = get_alternative_pkg(pkg)
+        if alternative_pkg:
+            modify, access = get_time_from_package(alternative_pkg)
 
-    if not modify and not access:
+    if not modify or not access:
+        return float('nan'), float('nan')
+
+    return int(modify), int(access)
+
+
+def get_pkg_time_weight(pkg):
+    modify, access = get_pkg_times(pkg)
+
+    if math.isnan(modify):
         return 0
 
     time_now = calendar.timegm(time.gmtime())
 
-    return linear_percent_function(modify, access, time_now)
+    return float(linear_percent_function(modify, access, time_now))
 
 
 def calculate_time_curve(pkg_time_weight):
-
-    if not pkg_time_weight:
-        return 0
+    pkg_time_weight = np.asarray(pkg_time_weight, dtype=float)
+    pkg_time_weight = np.where(np.isfinite(pkg_time_weight),
+                               pkg_time_weight, 0)
 
     const_a = 10
     lambda_value = 1
 
-    return const_a * (1 / math.exp((1 - pkg_time_weight) * lambda_value))
+    time_curve = const_a * np.exp((pkg_time_weight - 1) * lambda_value)
 
+    return np.where(pkg_time_weight != 0, time_curve, 0)
 
-def time_weight(term, term_list):
-    weight = []
+
+def get_pkgs_time_weights(pkgs):
+    """
+    Return an array with the time curve weight of every package of pkgs,
+    computed in a single vectorized pass. The weights depend on the current
+    time, so they are not kept between calls; the file times they are
+    computed from are cached by FileTimeService.
+    """
+    if not len(pkgs):
+        return np.zeros(0)
+
+    times = np.array([get_pkg_times(pkg) for pkg in pkgs], dtype=float)
+    time_now = calendar.timegm(time.gmtime())
+
+    percents = linear_percent_function(times[:, 0], times[:, 1], time_now)
+    return np.asarray(calculate_time_curve(percents), dtype=float)
+
+
+def terms_time_weight(terms, terms_packages):
+    """
+    Return an array with the time weight of every term of terms: the mean
+    of the time curve weights of the five most recently used packages with
+    the term. Terms found on less than five packages are completed with
+    weights decreasing from their least recently used package.
+    """
     weight_len = 5
     weight_delta = 0.2
 
-    for pkg in term_list:
-        if pkg in pkgs_time_weight:
-            weight.append(pkgs_time_weight[pkg])
-        else:
-            pkg_time_weight = get_pkg_time_weight(pkg)
-            pkgs_time_weight[pkg] = pkg_time_weight
-            weight.append(calculate_time_curve(pkg_time_weight))
+    if not len(terms):
+        return np.zeros(0)
 
-    weight = list(reversed(sorted(weight)))
-    if len(weight) < weight_len:
-        for i in range(len(weight), weight_len):
-            weight.append(weight[-1] - weight_delta)
+    pkgs, pkgs_ids = [], {}
+    terms_index, pkgs_index = [], []
+    for term_index, term in enumerate(terms):
+        for pkg in terms_packages[term]:
+            if pkg not in pkgs_ids:
+                pkgs_ids[pkg] = len(pkgs)
+                pkgs.append(pkg)
+            terms_index.append(term_index)
+            pkgs_index.append(pkgs_ids[pkg])
 
-    time_weight = float(sum(weight[0:weight_len])) / float(weight_len)
+    terms_index = np.array(terms_index, dtype=np.int64)
+    weights = get_pkgs_time_weights(pkgs)[pkgs_index]
 
-    best_weight_terms[term] = time_weight
+    # Sort the weights of every term from the best to the worst one and
+    # rank them inside each term
+    order = np.lexsort((-weights, terms_index))
+    terms_index, weights = terms_index[order], weights[order]
 
-    return time_weight
+    counts = np.bincount(terms_index, minlength=len(terms))
+    starts = np.cumsum(counts) - counts
+    ranks = np.arange(len(terms_index)) - starts[terms_index]
+
+    best = ranks < weight_len
+    best_sum = np.bincount(terms_index[best], weights=weights[best],
+                           minlength=len(terms))
+    best_count = np.minimum(counts, weight_len)
+
+    # Weights of a term appended while it has less than weight_len ones,
+    # each weight_delta lower than the previous
+    last = ranks == best_count[terms_index] - 1
+    worst = np.bincount(terms_index[last], weights=weights[last],
+                        minlength=len(terms))
+    missing = weight_len - best_count
+    padding = (missing * worst -
+               weight_delta * missing * (missing + 1) / 2.0)
+
+    terms_weight = np.where(counts > 0,
+                            (best_sum + padding) / float(weight_len), 0)
+
+    best_weight_terms.update(zip(terms, terms_weight))
+
+    return terms_weight
+
+
+def time_weight(term, term_list):
+    return float(terms_time_weight([term], {term: term_list})[0])
 
 
 def print_best_weight_terms(terms_package):
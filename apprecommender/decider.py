@@ -1,10 +1,12 @@
 #!/usr/bin/env python
 
-import commands
+import hashlib
 import re
 import xapian
 
 from apprecommender.apt_cache import AptCache
+from apprecommender.dependency_graph import DependencyGraph
+from apprecommender.dpkg_status import DpkgStatus
 
 from sklearn.feature_extraction.stop_words import ENGLISH_STOP_WORDS
 
@@ -23,34 +25,22 @@ class PkgInitDecider():
 
     def __init__(self):
         self.cache = AptCache()
+        self.graph = DependencyGraph.get()
         self.user_role_programs = self.get_user_role_programs()
 
     def is_in_apt_cache(self, pkg):
         return pkg in self.cache
 
     def get_package_dependencies(self, pkg):
-        return [dep[0].name for dep in pkg.dependencies]
+        return self.graph.get_dependencies([pkg])
 
     def get_user_installed_packages(self):
-        manual_installed = commands.getoutput('apt-mark showmanual')
-        return manual_installed.splitlines()
+        return DpkgStatus().get_manual_pkgs()
 
     def get_user_role_programs(self):
         user_pkgs = self.get_user_installed_packages()
-        user_programs = set()
 
-        for pkg in user_pkgs:
-            if pkg in self.cache:
-                pkg_candidate = self.cache[pkg].candidate
-                pkg_tags = pkg_candidate.record.get('Tag', None)
-
-                if not pkg_tags:
-                    continue
-
-                if 'role::program' in pkg_tags:
-                    user_programs.add(pkg)
-
-        return user_programs
+        return self.graph.filter_by_flags(user_pkgs, DependencyGraph.PROGRAM)
 
     def is_section_doc(self, pkg_section):
         return pkg_section == 'doc'
@@ -62,25 +52,13 @@ class PkgInitDecider():
         return tags_dep or section_dep
 
     def is_program_dependencies_installed(self, pkg):
-        pkg_dependencies = self.get_package_dependencies(pkg)
-        dep_programs = set()
-
-        for dep in pkg_dependencies:
-            if dep in self.cache:
-                pkg = self.cache[dep].candidate
-
-                if pkg is not None:
-                    pkg_tags = pkg.record.get('Tag', None)
-                    pkg_section = pkg.section
-
-                    if pkg_tags is None:
-                        continue
-
-                    is_valid_dependency = self.is_valid_dependency(
-                        pkg_tags, pkg_section)
-
-                    if is_valid_dependency:
-                        dep_programs.add(dep)
+        """
+        True if the dependencies of the package which are programs,
+        editors or interpreters are all programs installed by the user.
+        """
+        dep_programs = self.graph.filter_by_flags(
+            self.get_package_dependencies(pkg),
+            DependencyGraph.PROGRAM_DEPENDENCY)
 
         return len(dep_programs - self.user_role_programs) == 0
 
@@ -106,18 +84,16 @@ class PkgInitDecider():
         if not self.is_in_apt_cache(pkg):
             return False
 
-        pkg_candidate = self.cache[pkg].candidate
-
-        if not pkg_candidate:
+        if not self.cache.has_candidate(pkg):
             return False
 
-        if not self.is_program_dependencies_installed(pkg_candidate):
+        if not self.is_program_dependencies_installed(pkg):
             return False
 
         if self.is_pkg_a_prefix_or_suffix(pkg):
             return False
 
-        if self.is_section_doc(pkg_candidate.section):
+        if self.is_section_doc(self.cache.get_section(pkg)):
             return False
 
         return True
@@ -141,7 +117,9 @@ class PkgMatchDecider(xapian.MatchDecider):
         True if the package is not already installed and is not a lib or
         a xapian_document.
         """
-        pkg = xapian_document.get_data()
+        return self.is_valid_pkg(xapian_document.get_data())
+
+    def is_valid_pkg(self, pkg):
         is_new = pkg not in self.pkgs_list
         is_new = is_new and ':' not in pkg
 
@@ -156,6 +134,67 @@ class PkgMatchDecider(xapian.MatchDecider):
         return is_new
 
 
+class PkgMatchFilter():
+
+    """
+    Native counterpart of PkgMatchDecider. The package rules are stored as
+    boolean terms when the index is built, so installed packages, libs and
+    docs are excluded by the query itself instead of by a python callback.
+    """
+
+    METADATA_KEY = 'apprecommender_match_filter'
+    EXCLUDED_TERM = 'XARexcluded'
+    KDE_TERM = 'XARkde'
+    GNOME_TERM = 'XARgnome'
+
+    @staticmethod
+    def get_document_terms(pkg):
+        """
+        Return the boolean terms that must be added to the document of pkg.
+        """
+        if ':' in pkg:
+            return [PkgMatchFilter.EXCLUDED_TERM]
+        if "kde" in pkg:
+            return [PkgMatchFilter.KDE_TERM]
+        if "gnome" in pkg:
+            return [PkgMatchFilter.GNOME_TERM]
+        if re.match(r'^lib.*', pkg) or re.match(r'.*doc$', pkg):
+            return [PkgMatchFilter.EXCLUDED_TERM]
+
+        return []
+
+    @staticmethod
+    def is_indexed(index):
+        """
+        True if the index was built with the package rules terms.
+        """
+        return index.get_metadata(PkgMatchFilter.METADATA_KEY) == '1'
+
+    def __init__(self, pkgs_list):
+        """
+        Set initial parameters.
+        """
+        self.pkgs_list = pkgs_list
+
+    def get_excluded_terms(self):
+        excluded_terms = ["XP" + pkg for pkg in self.pkgs_list]
+        excluded_terms.append(PkgMatchFilter.EXCLUDED_TERM)
+
+        if "kde" not in self.pkgs_list:
+            excluded_terms.append(PkgMatchFilter.KDE_TERM)
+        if "gnome" not in self.pkgs_list:
+            excluded_terms.append(PkgMatchFilter.GNOME_TERM)
+
+        return excluded_terms
+
+    def filter_query(self, query):
+        """
+        Return query without the documents PkgMatchDecider would reject.
+        """
+        excluded = xapian.Query(xapian.Query.OP_OR, self.get_excluded_terms())
+        return xapian.Query(xapian.Query.OP_AND_NOT, query, excluded)
+
+
 class PkgExpandDecider(xapian.ExpandDecider):
 
     """
@@ -185,7 +224,9 @@ class PkgExpandDecider(xapian.ExpandDecider):
 class PkgReverseDependeciesDecider(xapian.MatchDecider):
 
     """
-    Extend xapian.MatchDecider to consider only packages on valid list
+    Extend xapian.MatchDecider to consider only packages on valid list.
+    The valid packages are computed once on the dependency graph, so they
+    can also be applied as a boolean filter of the query.
     """
 
     def __init__(self, reverse_dependencies, user_installed_pkgs):
@@ -196,29 +237,45 @@ class PkgReverseDependeciesDecider(xapian.MatchDecider):
         self.reverse_dependencies = reverse_dependencies
         self.pkg_init_decider = PkgInitDecider()
         self.pkg_match_decider = PkgMatchDecider(user_installed_pkgs)
-        self.cache = AptCache()
+        self.valid_pkgs = None
 
-    def __call__(self, xapian_document):
+    def get_valid_pkgs(self):
         """
-        True if the package is on pkg_list
+        Return the reverse dependencies on the cache and the axi index
+        which are not docs, have their program dependencies installed and
+        are not rejected by PkgMatchDecider.
         """
-        pkg = xapian_document.get_data()
-
-        if pkg not in self.reverse_dependencies:
-            return False
-
-        if pkg not in self.cache:
-            return False
-
-        if self.cache[pkg].section == 'doc':
-            return False
+        if self.valid_pkgs is None:
+            graph = self.pkg_init_decider.graph
+            pkgs = graph.filter_by_flags(
+                self.reverse_dependencies,
+                DependencyGraph.IN_CACHE | DependencyGraph.IN_AXI)
+
+            decider = self.pkg_init_decider
+            self.valid_pkgs = set(
+                pkg for pkg in pkgs
+                if not graph.has_flags(pkg, DependencyGraph.DOC) and
+                decider.is_program_dependencies_installed(pkg) and
+                self.pkg_match_decider.is_valid_pkg(pkg))
+
+        return self.valid_pkgs
+
+    def filter_query(self, query):
+        """
+        Return query restricted to the documents of the valid packages.
+        """
+        valid_terms = ["XP" + pkg for pkg in sorted(self.get_valid_pkgs())]
+        if not valid_terms:
+            return xapian.Query()
 
-        decider = self.pkg_init_decider
-        pkg_candidate = self.cache[pkg].candidate
-        if not decider.is_program_dependencies_installed(pkg_candidate):
-            return False
+        valid = xapian.Query(xapian.Query.OP_OR, valid_terms)
+        return xapian.Query(xapian.Query.OP_FILTER, query, valid)
 
-        return self.pkg_match_decider(xapian_document)
+    def __call__(self, xapian_document):
+        """
+        True if the package is on pkg_list
+        """
+        return xapian_document.get_data() in self.get_valid_pkgs()
 
 
 class TagExpandDecider(xapian.ExpandDecider):
@@ -234,20 +291,106 @@ class TagExpandDecider(xapian.ExpandDecider):
         return term.startswith("XT")
 
 
-class FilterTag(xapian.ExpandDecider):
+class TermClassification:
 
     """
-    Extend xapian.ExpandDecider to consider only tag terms.
+    Compiled classification of the terms of an items repository, so the
+    content filters classify a term with a single lookup. It is stored with
+    the package term matrix, for the valid tags it was compiled with.
     """
 
-    def __init__(self, valid_tags):
+    TAG = 1
+    DESCRIPTION = 2
+
+    @staticmethod
+    def get_tags_key(valid_tags):
+        return hashlib.sha1(repr(sorted(valid_tags or []))).hexdigest()
+
+    @staticmethod
+    def classify_terms(terms, valid_tags):
+        """
+        Return the flags of every term of terms.
+        """
+        filter_tag = FilterTag(valid_tags)
+        filter_description = FilterDescription()
+
+        terms_flags = []
+        for term in terms:
+            flags = 0
+            if filter_tag(term):
+                flags |= TermClassification.TAG
+            if filter_description(term):
+                flags |= TermClassification.DESCRIPTION
+            terms_flags.append(flags)
+
+        return terms_flags
+
+    def __init__(self, terms, flags):
+        self.flags = flags
+        self.terms_flags = dict(zip(terms, flags.tolist()))
+        self.expand_deciders = {}
+
+    def get_flags(self, term):
+        return self.terms_flags.get(term)
+
+    def get_expand_decider(self, accepted_flags):
+        """
+        Return a native xapian decider accepting the terms with any of the
+        accepted_flags, so eset expansion does not call back into python.
+        """
+        if accepted_flags not in self.expand_deciders:
+            terms = [term for term, flags in self.terms_flags.iteritems()
+                     if flags & accepted_flags]
+            expand_decider = xapian.ExpandDeciderFilterTerms(terms)
+            self.expand_deciders[accepted_flags] = expand_decider
+
+        return self.expand_deciders[accepted_flags]
+
+
+class ClassifiedTermFilter(xapian.ExpandDecider):
+
+    """
+    Extend xapian.ExpandDecider to look up terms on a TermClassification,
+    when there is one, before classifying them.
+    """
+
+    accepted_flags = 0
+
+    def __init__(self, classification=None):
         """
         Set initial parameters.
         """
         xapian.ExpandDecider.__init__(self)
-        self.valid_tags = valid_tags
+        self.classification = classification
 
     def __call__(self, term):
+        if self.classification is not None:
+            flags = self.classification.get_flags(term)
+            if flags is not None:
+                return bool(flags & self.accepted_flags)
+
+        return self.classify(term)
+
+    def classify(self, term):
+        raise NotImplementedError("Method not implemented.")
+
+
+class FilterTag(ClassifiedTermFilter):
+
+    """
+    Extend xapian.ExpandDecider to consider only tag terms.
+    """
+
+    accepted_flags = TermClassification.TAG
+
+    def __init__(self, valid_tags, classification=None):
+        """
+        Set initial parameters.
+        """
+        ClassifiedTermFilter.__init__(self, classification)
+        self.valid_tags = valid_tags
+
+    def classify(self, term):
         """
         Return true if the term is a tag, else false.
         """
@@ -258,17 +401,19 @@ class FilterTag(xapian.ExpandDecider):
         return term.startswith("XT") and is_valid
 
 
-class FilterDescription(xapian.ExpandDecider):
+class FilterDescription(ClassifiedTermFilter):
 
     """
     Extend xapian.ExpandDecider to consider only package description terms.
     """
 
-    def __init__(self):
-        xapian.ExpandDecider.__init__(self)
+    accepted_flags = TermClassification.DESCRIPTION
+
+    def __init__(self, classification=None):
+        ClassifiedTermFilter.__init__(self, classification)
         self.stop_words = ENGLISH_STOP_WORDS
 
-    def __call__(self, term):
+    def classify(self, term):
         """
         Return true if the term or its stemmed version is part of a package
         description.
@@ -279,24 +424,79 @@ class FilterDescription(xapian.ExpandDecider):
         return False
 
 
-class FilterTag_or_Description(xapian.ExpandDecider):
+class FilterTag_or_Description(ClassifiedTermFilter):
 
     """
     Extend xapian.ExpandDecider to consider only package description terms.
     """
 
-    def __init__(self, valid_tags):
+    accepted_flags = TermClassification.TAG | TermClassification.DESCRIPTION
+
+    def __init__(self, valid_tags, classification=None):
         """
         Set initial parameters.
         """
-        xapian.ExpandDecider.__init__(self)
+        ClassifiedTermFilter.__init__(self, classification)
         self.valid_tags = valid_tags
+        self.filter_tag = FilterTag(valid_tags)
+        self.filter_description = FilterDescription()
 
-    def __call__(self, term):
+    def classify(self, term):
         """
         Return true if the term or its stemmed version is part of a package
         description.
         """
-        is_tag = FilterTag(self.valid_tags)(term)
-        is_description = FilterDescription()(term)
+        is_tag = self.filter_tag(term)
+        is_description = self.filter_description(term)
         return is_tag or is_description
+
+
+class FilterAny(xapian.ExpandDecider):
+
+    """
+    Extend xapian.ExpandDecider to consider the terms accepted by any of a
+    dict of named filters, classifying every term only once.
+    """
+
+    def __init__(self, content_filters):
+        """
+        Set initial parameters.
+        """
+        xapian.ExpandDecider.__init__(self)
+        self.content_filters = content_filters
+        self.terms_filters = {}
+
+    def get_filters(self, term):
+        """
+        Return the names of the filters that accept the term.
+        """
+        if term not in self.terms_filters:
+            self.terms_filters[term] = frozenset(
+                name for name, content_filter in
+                self.content_filters.iteritems() if content_filter(term))
+
+        return self.terms_filters[term]
+
+    def __call__(self, term):
+        """
+        Return true if any of the filters accepts the term.
+        """
+        return bool(self.get_filters(term))
+
+    def get_expand_decider(self):
+        """
+        Return a native xapian decider accepting the same terms when every
+        filter uses the same term classification, else this decider.
+        """
+        classifications = set(getattr(content_filter, 'classification', None)
+                              for content_filter in
+                              self.content_filters.itervalues())
+
+        if len(classifications) != 1 or None in classifications:
+            return self
+
+        accepted_flags = 0
+        for content_filter in self.content_filters.itervalues():
+            accepted_flags |= content_filter.accepted_flags
+
+        return classifications.pop().get_expand_decider(accepted_flags)
@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+
+from apprecommender.apt_cache import AptCache
+from apprecommender.config import Config
+from apprecommender.pkg_metadata import PkgMetadata
+
+
+class DependencyGraph:
+
+    """
+    Dependency graph of the apt cache packages, with integer node ids and
+    adjacency arrays in CSR format: the first alternative and all the
+    alternatives of the candidate dependencies, and the reverse relations
+    listed by apt-cache rdepends. Package tags and section are compiled as
+    flags for every package with a candidate, and IN_AXI marks the packages
+    on the axi index. It is rebuilt when the apt lists change, as the
+    candidates do not depend on the dpkg status.
+    """
+
+    IN_CACHE = 1
+    HAS_CANDIDATE = 2
+    PROGRAM = 4
+    PROGRAM_DEPENDENCY = 8
+    DOC = 16
+    IN_AXI = 32
+
+    # relations of candidate.dependencies
+    DEPENDS_TYPES = ('PreDepends', 'Depends')
+    # relations listed by apt-cache rdepends
+    REVERSE_TYPES = ('PreDepends', 'Depends', 'Recommends', 'Suggests',
+                     'Enhances', 'Conflicts', 'Breaks', 'Replaces')
+
+    ADJACENCIES = ('dependencies', 'or_dependencies',
+                   'reverse_dependencies')
+    NAMES_FILE = 'names.pickle'
+    FLAGS_FILE = 'flags.npy'
+    INFO_FILE = 'info.pickle'
+
+    loaded = None
+
+    @staticmethod
+    def get_pkg_flags(pkg, axi):
+        flags = DependencyGraph.IN_CACHE
+        if axi.get_termfreq('XP' + pkg.name) > 0:
+            flags |= DependencyGraph.IN_AXI
+
+        candidate = pkg.candidate
+        if candidate is None:
+            return flags
+
+        flags |= DependencyGraph.HAS_CANDIDATE
+        tags = candidate.record.get('Tag', None)
+
+        if tags is not None:
+            if 'role::program' in tags:
+                flags |= DependencyGraph.PROGRAM
+            if ('role::program' in tags or 'devel::editor' in tags or
+                    candidate.section == 'interpreters'):
+                flags |= DependencyGraph.PROGRAM_DEPENDENCY
+
+        if candidate.section == 'doc':
+            flags |= DependencyGraph.DOC
+
+        return flags
+
+    @staticmethod
+    def to_csr(edges, num_nodes):
+        """
+        Return the indptr and indices arrays of the (source, target) edges.
+        """
+        edges = np.array(sorted(set(edges)), dtype=np.int32).reshape(-1, 2)
+        counts = np.bincount(edges[:, 0], minlength=num_nodes)
+        indptr = np.concatenate(([0], np.cumsum(counts))).astype(np.int32)
+
+        return indptr, edges[:, 1].copy()
+
+    @staticmethod
+    def build(cache, axi, graph_dir):
+        """
+        Compile the dependency graph of the packages of cache into
+        graph_dir.
+        """
+        parent_dir = os.path.dirname(os.path.abspath(graph_dir))
+        if not os.path.exists(parent_dir):
+            os.makedirs(parent_dir)
+        build_dir = tempfile.mkdtemp(
+            prefix=os.path.basename(graph_dir) + '.', dir=parent_dir)
+
+        try:
+            lists_mtime = PkgMetadata.get_lists_mtime()
+            names, ids, flags = [], {}, []
+            edges = dict((adjacency, []) for adjacency in
+                         DependencyGraph.ADJACENCIES)
+
+            def get_id(name):
+                if name not in ids:
+                    ids[name] = len(names)
+                    names.append(name)
+                    flags.append(0)
+                return ids[name]
+
+            for pkg in cache:
+                pkg_id = get_id(pkg.name)
+                flags[pkg_id] = DependencyGraph.get_pkg_flags(pkg, axi)
+
+                candidate = pkg.candidate
+                if candidate is None:
+                    continue
+
+                for dep in candidate.get_dependencies(
+                        *DependencyGraph.DEPENDS_TYPES):
+                    edges['dependencies'].append(
+                        (pkg_id, get_id(dep.or_dependencies[0].name)))
+                    for or_dep in dep.or_dependencies:
+                        edges['or_dependencies'].append(
+                            (pkg_id, get_id(or_dep.name)))
+
+                for dep in candidate.get_dependencies(
+                        *DependencyGraph.REVERSE_TYPES):
+                    for or_dep in dep.or_dependencies:
+                        edges['reverse_dependencies'].append(
+                            (get_id(or_dep.name), pkg_id))
+
+            for adjacency, adjacency_edges in edges.iteritems():
+                indptr, indices = DependencyGraph.to_csr(adjacency_edges,
+                                                         len(names))
+                np.save(os.path.join(build_dir, adjacency + '_indptr.npy'),
+                        indptr)
+                np.save(os.path.join(build_dir, adjacency + '_indices.npy'),
+                        indices)
+
+            np.save(os.path.join(build_dir, DependencyGraph.FLAGS_FILE),
+                    np.array(flags, dtype=np.uint8))
+
+            with open(os.path.join(build_dir, DependencyGraph.NAMES_FILE),
+                      'wb') as names_file:
+                pickle.dump(names, names_file)
+
+            with open(os.path.join(build_dir, DependencyGraph.INFO_FILE),
+                      'wb') as info_file:
+                pickle.dump({'lists_mtime': lists_mtime}, info_file)
+
+            DependencyGraph.install(build_dir, graph_dir)
+        except BaseException:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            if os.path.islink(build_dir + '.link'):
+                os.remove(build_dir + '.link')
+            raise
+
+        logging.info("Dependency graph: %d packages, %d dependencies" %
+                     (len(names), len(edges['or_dependencies'])))
+
+    @staticmethod
+    def install(build_dir, graph_dir):
+        """
+        Point graph_dir to build_dir with an atomic rename of a symbolic
+        link, so other processes never load a partial graph. The arrays of
+        the replaced graph stay valid for the processes that mapped them.
+        """
+        previous_dir = None
+        if os.path.islink(graph_dir):
+            previous_dir = os.path.realpath(graph_dir)
+        elif os.path.isdir(graph_dir):
+            shutil.rmtree(graph_dir)
+
+        link_path = build_dir + '.link'
+        os.symlink(os.path.basename(build_dir), link_path)
+        os.rename(link_path, graph_dir)
+
+        if previous_dir is not None:
+            shutil.rmtree(previous_dir, ignore_errors=True)
+
+    @staticmethod
+    def get(graph_dir=None):
+        """
+        Return the dependency graph on graph_dir, building it from the apt
+        cache if it is missing or outdated.
+        """
+        graph_dir = graph_dir or Config().dependency_graph_dir
+        lists_mtime = PkgMetadata.get_lists_mtime()
+
+        graph = DependencyGraph.loaded
+        if (graph is not None and graph.graph_dir == graph_dir and
+                graph.lists_mtime == lists_mtime):
+            return graph
+
+        try:
+            graph = DependencyGraph(graph_dir)
+        except (IOError, ValueError, EOFError, KeyError,
+                pickle.UnpicklingError):
+            graph = None
+
+        if graph is None or graph.lists_mtime != lists_mtime:
+            logging.warning("Building dependency graph on %s from the apt "
+                            "cache" % graph_dir)
+            DependencyGraph.build(AptCache().cache, AptCache().axi, graph_dir)
+            graph = DependencyGraph(graph_dir)
+
+        DependencyGraph.loaded = graph
+        return graph
+
+    def __init__(self, graph_dir):
+        self.graph_dir = graph_dir
+        # Resolved once, so all the files come from the same build
+        self.data_dir = os.path.realpath(graph_dir)
+
+        with open(os.path.join(self.data_dir, DependencyGraph.INFO_FILE),
+                  'rb') as info_file:
+            self.lists_mtime = pickle.load(info_file)['lists_mtime']
+
+        with open(os.path.join(self.data_dir, DependencyGraph.NAMES_FILE),
+                  'rb') as names_file:
+            self.names = pickle.load(names_file)
+        self.ids = dict((name, pkg_id)
+                        for pkg_id, name in enumerate(self.names))
+
+        self.flags = self.load_array(DependencyGraph.FLAGS_FILE)
+        self.adjacencies = {}
+        for adjacency in DependencyGraph.ADJACENCIES:
+            self.adjacencies[adjacency] = (
+                self.load_array(adjacency + '_indptr.npy'),
+                self.load_array(adjacency + '_indices.npy'))
+
+    def load_array(self, file_name):
+        return np.load(os.path.join(self.data_dir, file_name),
+                       mmap_mode='r')
+
+    def get_ids(self, pkgs):
+        return np.array([self.ids[pkg] for pkg in pkgs if pkg in self.ids],
+                        dtype=np.int32)
+
+    def get_names(self, pkg_ids):
+        return set(self.names[pkg_id] for pkg_id in pkg_ids)
+
+    def get_neighbors_ids(self, adjacency, pkg_ids):
+        indptr, indices = self.adjacencies[adjacency]
+        neighbors = [indices[indptr[pkg_id]:indptr[pkg_id + 1]]
+                     for pkg_id in pkg_ids]
+
+        if not neighbors:
+            return np.array([], dtype=np.int32)
+        return np.unique(np.concatenate(neighbors))
+
+    def get_neighbors(self, adjacency, pkgs):
+        """
+        Return the union of the adjacent packages of every package of pkgs.
+        """
+        return self.get_names(self.get_neighbors_ids(adjacency,
+                                                     self.get_ids(pkgs)))
+
+    def get_dependencies(self, pkgs):
+        return self.get_neighbors('dependencies', pkgs)
+
+    def get_or_dependencies(self, pkgs):
+        return self.get_neighbors('or_dependencies', pkgs)
+
+    def get_reverse_dependencies(self, pkgs):
+        return self.get_neighbors('reverse_dependencies', pkgs)
+
+    def filter_by_flags(self, pkgs, flags):
+        """
+        Return the packages of pkgs with all the given flags.
+        """
+        pkg_ids = self.get_ids(pkgs)
+        pkg_ids = pkg_ids[(self.flags[pkg_ids] & flags) == flags]
+
+        return self.get_names(pkg_ids)
+
+    def has_flags(self, pkg, flags):
+        if pkg not in self.ids:
+            return False
+        return (self.flags[self.ids[pkg]] & flags) == flags
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+
+import os
+import threading
+
+from apprecommender.singleton import Singleton
+
+
+class DpkgStatus(Singleton):
+
+    """
+    Reader of the dpkg status database and the apt extended states. Both
+    files are parsed in a single streaming pass and the result is kept until
+    one of them is modified. Auto installed marks are per architecture, as
+    on multiarch systems a package may be manual on one architecture only.
+    """
+
+    STATUS_PATH = '/var/lib/dpkg/status'
+    EXTENDED_STATES_PATH = '/var/lib/apt/extended_states'
+
+    SYSTEM_PRIORITIES = frozenset(['important', 'required', 'standard'])
+    NOT_INSTALLED_STATES = frozenset(['not-installed', 'config-files'])
+    REMOVED_SELECTIONS = frozenset(['deinstall', 'purge'])
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            self.lock = threading.Lock()
+            self.mtimes = None
+            self.installed_pkgs = frozenset()
+            self.pkgs_archs = {}
+            self.auto_pkgs = frozenset()
+            self.manual_pkgs = frozenset()
+            self.pkgs_priority = {}
+            self.initialized = 1
+
+    @staticmethod
+    def get_mtime(file_path):
+        try:
+            return os.path.getmtime(file_path)
+        except OSError:
+            return None
+
+    @staticmethod
+    def read_stanzas(file_path, fields):
+        """
+        Yield a dict with the selected fields of every stanza of a deb822
+        file, such as the dpkg status.
+        """
+        stanza = {}
+
+        try:
+            status_file = open(file_path)
+        except IOError:
+            return
+
+        with status_file:
+            for line in status_file:
+                if not line.strip():
+                    if stanza:
+                        yield stanza
+                    stanza = {}
+                elif line[0] not in ' \t':
+                    field, _, value = line.partition(':')
+                    if field in fields:
+                        stanza[field] = value.strip()
+
+        if stanza:
+            yield stanza
+
+    def parse_status(self):
+        """
+        Return the installed packages, their priorities and a dict with the
+        architectures each package is installed on.
+        """
+        installed_pkgs, pkgs_priority, pkgs_archs = set(), {}, {}
+
+        for stanza in DpkgStatus.read_stanzas(
+                DpkgStatus.STATUS_PATH,
+                ('Package', 'Status', 'Priority', 'Architecture')):
+            status = stanza.get('Status', '').split()
+
+            if len(status) != 3 or 'Package' not in stanza:
+                continue
+
+            selection, _, state = status
+            if (selection in DpkgStatus.REMOVED_SELECTIONS or
+                    state in DpkgStatus.NOT_INSTALLED_STATES):
+                continue
+
+            installed_pkgs.add(stanza['Package'])
+            pkgs_priority[stanza['Package']] = stanza.get('Priority')
+            pkgs_archs.setdefault(stanza['Package'], set()).add(
+                stanza.get('Architecture'))
+
+        return frozenset(installed_pkgs), pkgs_priority, pkgs_archs
+
+    def parse_extended_states(self):
+        """
+        Return the (package, architecture) pairs marked as auto installed.
+        """
+        auto_pkgs = set()
+
+        for stanza in DpkgStatus.read_stanzas(
+                DpkgStatus.EXTENDED_STATES_PATH,
+                ('Package', 'Architecture', 'Auto-Installed')):
+            if stanza.get('Auto-Installed') == '1' and 'Package' in stanza:
+                auto_pkgs.add((stanza['Package'], stanza.get('Architecture')))
+
+        return frozenset(auto_pkgs)
+
+    def is_auto_pkg(self, pkg, auto_archs):
+        """
+        True if the package is auto installed on every architecture it is
+        installed on. Apt marks Architecture: all packages with the native
+        architecture, and old files may have no architecture at all, so
+        these match the marks of any architecture.
+        """
+        if not auto_archs:
+            return False
+        if None in auto_archs:
+            return True
+
+        return all(arch in auto_archs or arch in (None, 'all')
+                   for arch in self.pkgs_archs.get(pkg, ()))
+
+    def get_auto_archs(self):
+        auto_archs = {}
+        for pkg, arch in self.auto_pkgs:
+            auto_archs.setdefault(pkg, set()).add(arch)
+
+        return auto_archs
+
+    def update(self):
+        mtimes = (DpkgStatus.get_mtime(DpkgStatus.STATUS_PATH),
+                  DpkgStatus.get_mtime(DpkgStatus.EXTENDED_STATES_PATH))
+
+        with self.lock:
+            if mtimes != self.mtimes:
+                (self.installed_pkgs, self.pkgs_priority,
+                 self.pkgs_archs) = self.parse_status()
+                self.auto_pkgs = self.parse_extended_states()
+
+                auto_archs = self.get_auto_archs()
+                self.manual_pkgs = frozenset(
+                    pkg for pkg in self.installed_pkgs
+                    if not self.is_auto_pkg(pkg, auto_archs.get(pkg)))
+                self.mtimes = mtimes
+
+    def get_installed_pkgs(self):
+        self.update()
+        return set(self.installed_pkgs)
+
+    def get_manual_pkgs(self):
+        """
+        Return the installed packages that were not automatically installed,
+        as listed by apt-mark showmanual.
+        """
+        self.update()
+        return set(self.manual_pkgs)
+
+    def get_priority_pkgs(self, priorities=SYSTEM_PRIORITIES):
+        self.update()
+        return set(pkg for pkg, priority in self.pkgs_priority.iteritems()
+                   if priority in priorities)
@@ -505,7 +505,8 @@ class CrossValidationRecommender(CrossValidation):
         return Evaluation(predicted_result, real_result, num_docs)
 
     def get_model(self, cross_item_score):
-        return User(cross_item_score)
+        return User(cross_item_score,
+                    installed_pkgs=set(cross_item_score.keys()))
 
     def get_pkg_score(self, user):
         cross_item_score = {}
@@ -132,7 +132,8 @@ if __name__ == '__main__':
                     for i in range(sample_size):
                         key = random.choice(item_score.keys())
                         sample[key] = item_score.pop(key)
-                    iteration_user = User(item_score)
+                    iteration_user = User(
+                        item_score, installed_pkgs=set(item_score.keys()))
                     recommendation = rec.get_recommendation(
                         iteration_user, repo_size)
                     if hasattr(recommendation, "ranking"):
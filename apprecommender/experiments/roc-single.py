@@ -208,7 +208,8 @@ def run_strategy(cfg, user):
         for i in range(sample_size):
             key = random.choice(item_score.keys())
             sample[key] = item_score.pop(key)
-        iteration_user = User(item_score)
+        iteration_user = User(item_score,
+                              installed_pkgs=set(item_score.keys()))
         recommendation = rec.get_recommendation(iteration_user, repo_size)
         write_recall_log(
             label, n, sample, recommendation, profile_len, repo_size, log_file)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+import collections
+import os
+import threading
+import time
+
+from multiprocessing.pool import ThreadPool
+
+from apprecommender.singleton import Singleton
+
+
+class FileTimeService(Singleton):
+
+    """
+    Modify and access times of files and binaries, read in-process with one
+    lstat per file. Times are kept on a bounded LRU cache shared by threads
+    for at most MAX_AGE seconds, so long running processes see new access
+    times, and can be collected by a thread pool when the cache is cold.
+    """
+
+    MAX_FILES = 4096
+    MAX_AGE = 30
+    POOL_SIZE = 8
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            self.lock = threading.Lock()
+            self.times = collections.OrderedDict()
+            self.max_files = FileTimeService.MAX_FILES
+            self.max_age = FileTimeService.MAX_AGE
+            self.pool_size = FileTimeService.POOL_SIZE
+            self.initialized = 1
+
+    @staticmethod
+    def is_executable(file_path):
+        return os.path.isfile(file_path) and os.access(file_path, os.X_OK)
+
+    @staticmethod
+    def which(name):
+        """
+        Return the path of an executable, looked up on PATH as which does.
+        """
+        if os.path.dirname(name):
+            return name if FileTimeService.is_executable(name) else None
+
+        for path_dir in os.environ.get('PATH', os.defpath).split(os.pathsep):
+            file_path = os.path.join(path_dir, name)
+            if FileTimeService.is_executable(file_path):
+                return file_path
+
+        return None
+
+    def read_times(self, file_path, is_binary):
+        if is_binary:
+            file_path = FileTimeService.which(file_path)
+            if not file_path:
+                return None, None
+
+        # Like stat(1), symbolic links are not followed
+        try:
+            file_stat = os.lstat(file_path)
+        except OSError:
+            return None, None
+
+        return int(file_stat.st_mtime), int(file_stat.st_atime)
+
+    def get_times(self, file_path, is_binary=False):
+        """
+        Return the modify and access times of a file, or of a binary on
+        PATH if is_binary is set. Both are None if the file is not found.
+        """
+        key = (file_path, is_binary)
+        now = time.time()
+
+        with self.lock:
+            if key in self.times:
+                times, read_time = self.times.pop(key)
+                if now - read_time < self.max_age:
+                    self.times[key] = times, read_time
+                    return times
+
+        times = self.read_times(file_path, is_binary)
+
+        with self.lock:
+            self.times[key] = times, now
+            while len(self.times) > self.max_files:
+                self.times.popitem(last=False)
+
+        return times
+
+    def clear(self):
+        with self.lock:
+            self.times.clear()
+
+    def imap_unordered(self, function, items):
+        """
+        Yield the results of function over items as they are computed by
+        a pool of threads.
+        """
+        pool = ThreadPool(self.pool_size)
+
+        try:
+            for result in pool.imap_unordered(function, items):
+                yield result
+        finally:
+            pool.close()
+            pool.join()
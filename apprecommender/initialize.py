@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 
+import apt
 import commands
 import data
 import datetime
@@ -9,6 +10,9 @@ import xapian
 
 from apprecommender.config import Config
 from apprecommender.decider import PkgInitDecider
+from apprecommender.dependency_graph import DependencyGraph
+from apprecommender.pkg_metadata import PkgMetadata
+from apprecommender.term_matrix import PkgTermMatrix
 
 
 class Initialize:
@@ -23,7 +27,16 @@ class Initialize:
 
     def __init__(self):
         self.config = Config()
-        self.pkg_init_decider = PkgInitDecider()
+        self._pkg_init_decider = None
+
+    @property
+    def pkg_init_decider(self):
+        # Created on first use, so prepare_data compiles the dependency
+        # graph before the decider loads it
+        if self._pkg_init_decider is None:
+            self._pkg_init_decider = PkgInitDecider()
+
+        return self._pkg_init_decider
 
     def get_tags(self):
         command = "cat /var/lib/debtags/vocabulary" \
@@ -109,6 +122,9 @@ class Initialize:
                 if os.path.exists(self.config.axi_desktopapps):
                     shutil.rmtree(self.config.axi_desktopapps)
 
+                if os.path.exists(self.config.term_matrix_dir):
+                    shutil.rmtree(self.config.term_matrix_dir)
+
                 if os.path.exists(self.config.filters_dir):
                     shutil.rmtree(self.config.filters_dir)
 
@@ -116,6 +132,13 @@ class Initialize:
         except OSError:
             raise
 
+        print "\nCompiling package metadata"
+        cache, axi = apt.Cache(), xapian.Database(self.config.axi)
+        PkgMetadata.build(cache, axi, self.config.pkg_metadata)
+
+        print "\nCompiling package dependency graph"
+        DependencyGraph.build(cache, axi, self.config.dependency_graph_dir)
+
         tags = self.get_tags()
         tags_path = "{}/debtags".format(self.config.filters_dir)
         self.save_list(tags, tags_path)
@@ -126,6 +149,10 @@ class Initialize:
 
         self.indexer_axi('sample', pkgs_path)
 
+        print "\nExtracting package term matrix"
+        PkgTermMatrix.build(xapian.Database(self.config.axi_desktopapps),
+                            self.config.term_matrix_dir, tags)
+
     def get_role_program_pkgs(self):
         command = "cat /var/lib/debtags/package-tags | " \
                   "grep 'role::program' | " \
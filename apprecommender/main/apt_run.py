@@ -1,12 +1,15 @@
 #!/usr/bin/env python
 
 import argparse
+import logging
 import os
 import shutil
-import re
+import socket
 
 from apprecommender.config import Config
 from apprecommender.main.app_recommender import AppRecommender
+from apprecommender.main.daemon import (HOOK_TIMEOUT, RecommenderClient,
+                                        RecommenderDaemonError)
 from apprecommender.user import LocalSystem
 
 
@@ -69,17 +72,33 @@ class AptRun:
 
         return installed_pkgs
 
+    def get_daemon_recommendation_pkgs(self, installed_pkgs):
+        client = RecommenderClient(timeout=HOOK_TIMEOUT)
+
+        if not client.is_available():
+            return None
+
+        try:
+            response = client.get_recommendation(installed_pkgs,
+                                                 strategy='cbpkg')
+        except (socket.error, RecommenderDaemonError):
+            logging.info("Recommender daemon unavailable, running locally")
+            return None
+
+        return response['pkgs']
+
     def get_recommendation_pkgs(self, installed_pkgs):
+        pkgs = self.get_daemon_recommendation_pkgs(installed_pkgs)
+        if pkgs is not None:
+            return pkgs
+
         app_recommender = AppRecommender()
 
         app_recommender.recommender.set_strategy('cbpkg')
         rec = app_recommender.make_recommendation(
             reference_pkgs=installed_pkgs, print_recommendation=False)
 
-        pkgs_regex = re.compile(r'^\d:\s([^\s]+)', re.MULTILINE)
-        pkgs = pkgs_regex.findall(rec.__str__())
-
-        return pkgs
+        return [item.package for item in rec.ranked_items()]
 
     def make_recommendations(self, installed_pkgs):
         if len(installed_pkgs) > 0:
@@ -1,5 +1,7 @@
 #!/usr/bin/env python
 
+import logging
+import socket
 import xapian
 
 from apprecommender.main.app_recommender import AppRecommender
@@ -9,6 +11,7 @@ from apprecommender.strategy import (MachineLearning, MachineLearningBVA,
                                      MachineLearningBOW,
                                      MachineLearningTrainError)
 from apprecommender.main import collect_user_data
+from apprecommender.main import daemon
 from apprecommender.main import show_classifications
 from apprecommender.main.apt_run import AptRun
 from apprecommender.main.options import get_parser
@@ -35,7 +38,38 @@ def parse_options(args, config):
         config.num_recommendations = args['num_recommendations']
 
 
+DAEMON_ERRORS = {daemon.STATUS_ERROR_INIT: ERROR_INIT,
+                 daemon.STATUS_ERROR_TRAIN: ERROR_TRAIN,
+                 daemon.STATUS_PERMISSION_DENIED: PERMISSION_DENIED}
+
+
+def run_daemon_recommendation(client, reference_pkgs):
+    config = Config()
+
+    try:
+        response = client.get_recommendation(
+            reference_pkgs, strategy=config.strategy,
+            profile_size=config.profile_size,
+            num_recommendations=config.num_recommendations,
+            because=config.because, render=True)
+    except daemon.RecommenderDaemonError as error:
+        if error.status in DAEMON_ERRORS:
+            return DAEMON_ERRORS[error.status]
+        raise
+
+    print(response['recommendation'])
+    return SUCCESS
+
+
 def run_apprecommender(reference_pkgs):
+    client = daemon.RecommenderClient()
+
+    if client.is_available():
+        try:
+            return run_daemon_recommendation(client, reference_pkgs)
+        except (socket.error, daemon.RecommenderDaemonError):
+            logging.info("Recommender daemon unavailable, running locally")
+
     try:
         app_recommender = AppRecommender()
         app_recommender.make_recommendation(reference_pkgs)
@@ -90,6 +124,17 @@ def run(args):
         return SUCCESS
     elif args['init']:
         return run_initialize()
+    elif args['daemon']:
+        parse_options(args, Config())
+
+        try:
+            daemon.run_daemon()
+        except xapian.DatabaseOpeningError:
+            return ERROR_INIT
+        except (OSError, socket.error):
+            return PERMISSION_DENIED
+
+        return SUCCESS
     elif args['train']:
         return run_train()
     elif args['contribute']:
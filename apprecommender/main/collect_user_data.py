@@ -5,7 +5,6 @@ import commands
 import datetime as dt
 import logging
 import os
-import re
 import subprocess
 import tarfile
 import time
@@ -15,6 +14,7 @@ from apprecommender.apt_cache import AptCache
 from apprecommender.config import Config
 from apprecommender.data import get_user_installed_pkgs
 from apprecommender.data_classification import get_alternative_pkg
+from apprecommender.dpkg_status import DpkgStatus
 from apprecommender.main.app_recommender import AppRecommender
 from apprecommender.main.ml_cross_validation import ml_cross_validation
 from apprecommender.ml.data import MachineLearningData
@@ -38,8 +38,6 @@ RECOMMENDATIONS_TIME = LOG_PATH + '/recommendations_time.txt'
 
 PKGS_DEPENDENCIES = []
 
-RE_MATCH = re.compile(r'^\d:\s([^\s]+)', re.MULTILINE)
-
 
 def create_log_folder():
     print "Creating log folder"
@@ -120,9 +118,7 @@ def collect_manual_installed_pkgs():
     print "Collecting manual installed pkgs"
 
     if create_file(MANUAL_INSTALLED_PKGS_PATH):
-        packages = commands.getoutput('apt-mark showmanual')
-
-        packages = [pkg for pkg in packages.splitlines()]
+        packages = sorted(DpkgStatus().get_manual_pkgs())
 
         save_list(packages, MANUAL_INSTALLED_PKGS_PATH)
 
@@ -145,7 +141,7 @@ def collect_pkgs_time():
         with open(MANUAL_INSTALLED_PKGS_PATH, 'r') as text:
             manual_pkgs = [line.strip() for line in text]
 
-        pkgs_time = pkg_time.get_packages_time(manual_pkgs)
+        pkgs_time = pkg_time.update_packages_time(manual_pkgs)
 
         pkg_time.save_package_time(pkgs_time, PKGS_TIME_PATH)
 
@@ -166,9 +162,7 @@ def get_pkgs_of_recommendation(strategy):
     app_recommender.recommender.set_strategy(strategy)
     rec = app_recommender.make_recommendation(print_recommendation=False)
 
-    pkgs = RE_MATCH.findall(rec.__str__())
-
-    return pkgs
+    return [item.package for item in rec.ranked_items()]
 
 
 def collect_user_preferences():
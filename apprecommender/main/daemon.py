@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+
+import json
+import logging
+import os
+import re
+import socket
+import SocketServer
+import xapian
+
+from apprecommender.apt_cache import AptCache
+from apprecommender.config import Config
+from apprecommender.main.app_recommender import AppRecommender
+from apprecommender.strategy import MachineLearningTrainError
+
+STATUS_SUCCESS = 'success'
+STATUS_ERROR_INIT = 'error_init'
+STATUS_ERROR_TRAIN = 'error_train'
+STATUS_PERMISSION_DENIED = 'permission_denied'
+STATUS_INVALID_REQUEST = 'invalid_request'
+STATUS_ERROR = 'error'
+
+# The apt hook must not stall apt transactions on a wedged daemon
+CLI_TIMEOUT = 60
+HOOK_TIMEOUT = 5
+
+VALID_PKG_REGEX = re.compile(r'^[a-z0-9][a-z0-9+.-]+$')
+
+
+class RecommenderDaemonError(Exception):
+
+    def __init__(self, status=''):
+        self.status = status
+
+    def __str__(self):
+        return repr(self.status)
+
+
+class RecommendationHandler(SocketServer.StreamRequestHandler):
+
+    """
+    Answer one recommendation request per connection. Requests and responses
+    are single lines of json.
+    """
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            response = {'status': STATUS_INVALID_REQUEST}
+        else:
+            response = self.server.recommend(request)
+
+        self.wfile.write(json.dumps(response) + '\n')
+
+
+class RecommenderServer(SocketServer.UnixStreamServer):
+
+    """
+    Keep an AppRecommender loaded and answer recommendation requests over a
+    local unix socket, avoiding the cold start of every apprec invocation.
+    Responses carry the ranked (package, score, rank) items; the text of the
+    recommendation is only rendered when a request sets render.
+    """
+
+    def __init__(self, socket_path=None):
+        self.config = Config()
+        self.socket_path = socket_path or self.config.daemon_socket
+
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+        self.app_recommender = AppRecommender()
+        self.default_options = {
+            'strategy': self.config.strategy,
+            'profile_size': self.config.profile_size,
+            'num_recommendations': self.config.num_recommendations,
+            'because': self.config.because,
+            'render': False}
+
+        SocketServer.UnixStreamServer.__init__(self, self.socket_path,
+                                               RecommendationHandler)
+
+    def get_options(self, request):
+        options = dict(self.default_options)
+
+        for option in options:
+            if request.get(option) is not None:
+                options[option] = request[option]
+
+        return options
+
+    @staticmethod
+    def is_positive_int(value):
+        return (isinstance(value, (int, long)) and
+                not isinstance(value, bool) and value > 0)
+
+    def is_valid_options(self, options):
+        strategies = self.app_recommender.recommender.get_all_strategies()
+
+        return (isinstance(options['strategy'], basestring) and
+                options['strategy'] in strategies and
+                self.is_positive_int(options['profile_size']) and
+                self.is_positive_int(options['num_recommendations']) and
+                isinstance(options['because'], bool) and
+                isinstance(options['render'], bool))
+
+    def is_valid_request(self, request):
+        reference_pkgs = request.get('reference_pkgs', [])
+
+        if not isinstance(reference_pkgs, list):
+            return False
+
+        return all(isinstance(pkg, basestring) and VALID_PKG_REGEX.match(pkg)
+                   for pkg in reference_pkgs)
+
+    def make_recommendation(self, reference_pkgs, options):
+        self.config.num_recommendations = options['num_recommendations']
+        # The because packages are only shown on the rendered text
+        self.config.because = options['because'] and options['render']
+
+        AptCache().reset_if_outdated()
+
+        recommender = self.app_recommender.recommender
+        recommender.set_strategy(options['strategy'],
+                                 options['profile_size'])
+
+        return self.app_recommender.make_recommendation(
+            reference_pkgs, print_recommendation=False)
+
+    def recommend(self, request):
+        if not isinstance(request, dict) or not self.is_valid_request(request):
+            return {'status': STATUS_INVALID_REQUEST}
+
+        options = self.get_options(request)
+        if not self.is_valid_options(options):
+            return {'status': STATUS_INVALID_REQUEST}
+
+        try:
+            rec = self.make_recommendation(request.get('reference_pkgs', []),
+                                           options)
+        except xapian.DatabaseOpeningError:
+            return {'status': STATUS_ERROR_INIT}
+        except (IOError, MachineLearningTrainError):
+            return {'status': STATUS_ERROR_TRAIN}
+        except OSError:
+            return {'status': STATUS_PERMISSION_DENIED}
+        except Exception:
+            logging.exception("Recommender daemon request failed")
+            return {'status': STATUS_ERROR}
+
+        items = list(rec.ranked_items()) if rec else []
+        response = {'status': STATUS_SUCCESS,
+                    'pkgs': [item.package for item in items],
+                    'items': [list(item) for item in items]}
+
+        if options['render']:
+            response['recommendation'] = str(rec) if rec else ''
+
+        return response
+
+    def server_close(self):
+        SocketServer.UnixStreamServer.server_close(self)
+
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+class RecommenderClient:
+
+    """
+    Thin client used to ask a running RecommenderServer for
+    recommendations.
+    """
+
+    def __init__(self, socket_path=None, timeout=CLI_TIMEOUT):
+        self.socket_path = socket_path or Config().daemon_socket
+        self.timeout = timeout
+
+    def is_available(self):
+        return os.path.exists(self.socket_path)
+
+    def request(self, request):
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.settimeout(self.timeout)
+
+        try:
+            client.connect(self.socket_path)
+            client.sendall(json.dumps(request) + '\n')
+            response = client.makefile('r').readline()
+        finally:
+            client.close()
+
+        try:
+            response = json.loads(response)
+        except ValueError:
+            raise RecommenderDaemonError(STATUS_INVALID_REQUEST)
+
+        if response.get('status') != STATUS_SUCCESS:
+            raise RecommenderDaemonError(response.get('status'))
+
+        return response
+
+    def get_recommendation(self, reference_pkgs=None, strategy=None,
+                           profile_size=None, num_recommendations=None,
+                           because=None, render=False):
+        request = {'reference_pkgs': reference_pkgs or [],
+                   'strategy': strategy,
+                   'profile_size': profile_size,
+                   'num_recommendations': num_recommendations,
+                   'because': because,
+                   'render': render}
+
+        return self.request(request)
+
+
+def run_daemon(socket_path=None):
+    server = RecommenderServer(socket_path)
+    logging.info("Recommender daemon listening on %s" % server.socket_path)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -71,6 +71,12 @@ def get_parser():
         help='Disable recommendations when install a package with apt',
         action='store_true')
 
+    parser.add_argument(
+        '--daemon',
+        help='keep apprecommender loaded and answer recommendation '
+             'requests from apprec and apt',
+        action='store_true')
+
     parser.add_argument(
         '--update',
         help='Run both init and train commands',
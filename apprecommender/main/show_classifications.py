@@ -38,6 +38,6 @@ def main():
                 pkg_text += '\t'
             pkg_text += ' {}'
 
-            print pkg_text.format(pkg, pkgs_times[pkg][1].strip())
+            print pkg_text.format(pkg, pkgs_times[pkg][1])
 
     print '\nNum pkgs: {}'.format(len(pkg_classification))
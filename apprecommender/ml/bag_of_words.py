@@ -52,15 +52,19 @@ class BagOfWords():
         return description
 
     def classify_pkg(self, attribute_vector, transform=True):
-        if transform:
-            pkg_feature = self.vectorizer.transform([attribute_vector])
-            pkg_feature = pkg_feature.toarray()
-        else:
-            pkg_feature = attribute_vector
+        if not transform:
+            return self.classifier.predict(attribute_vector)[0]
 
-        label = self.classifier.predict(pkg_feature)
+        return self.classify_pkgs([attribute_vector])[0]
 
-        return label[0]
+    def classify_pkgs(self, pkgs_data):
+        pkgs_feature = self.vectorizer.transform(pkgs_data)
+
+        # GaussianNB does not accept sparse matrices, so the batch is
+        # converted to a dense array only once
+        labels = self.classifier.predict(pkgs_feature.toarray())
+
+        return labels.tolist()
 
     def create_pkg_data(self, pkg, axi, cache, ml_data):
         description = self.get_pkg_description(pkg, cache, ml_data)
@@ -69,6 +73,21 @@ class BagOfWords():
 
         return ' '.join(self.combine_pkg_info(description, debtags, section))
 
+    def create_pkgs_data(self, pkgs, axi, cache, ml_data):
+        pkgs_debtags = ml_data.get_pkgs_debtags(axi, pkgs)
+        pkgs_data = []
+
+        for pkg in pkgs:
+            description = self.get_pkg_description(pkg, cache, ml_data)
+            debtags = [debtag.replace('::', '_')
+                       for debtag in pkgs_debtags[pkg]]
+            section = self.get_pkg_section(pkg, cache, ml_data)
+
+            pkgs_data.append(' '.join(
+                self.combine_pkg_info(description, debtags, section)))
+
+        return pkgs_data
+
     def get_pkgs_classification(self, pkgs_list):
         pkgs_classification = []
 
@@ -102,13 +121,8 @@ class BagOfWords():
         return terms, debtags
 
     def prepare_data(self, pkg_list, axi, cache, ml_data):
-        pkgs_description = []
-        pkgs_classification = []
-
-        for pkg in pkg_list:
-            pkg_data = self.create_pkg_data(pkg, axi, cache, ml_data)
-            pkgs_description.append(pkg_data)
-
+        pkgs_description = self.create_pkgs_data(pkg_list, axi, cache,
+                                                 ml_data)
         pkgs_classification = self.get_pkgs_classification(pkg_list)
 
         return (pkgs_description, pkgs_classification)
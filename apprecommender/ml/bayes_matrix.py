@@ -60,6 +60,13 @@ class BayesMatrix:
 
     diag_histogram:       A diagonal matrix for the histogram one.
 
+    features_log_weight:  A a x l matrix with log(1 + prob) - log(2 - prob),
+                          the weight a present feature adds to every label.
+
+    labels_log_bias:      A vector with log(1 + label_probability) plus the
+                          sum of log(2 - prob) of every label, the score of
+                          a package without any feature.
+
     attribute_vector:     A vector 1 x a with the values of features to get a
                           classification for this vector based on the
                           training
@@ -75,6 +82,8 @@ class BayesMatrix:
         self.feature_per_label = None
         self.prob = None
         self.diag_histogram = None
+        self.features_log_weight = None
+        self.labels_log_bias = None
 
     def training(self, data_matrix, classifications,
                  order_of_classifications):
@@ -104,27 +113,35 @@ class BayesMatrix:
         self.prob = np.linalg.inv(
             self.diag_histogram) * self.feature_per_label
 
-    def get_classification(self, attribute_vector):
-        attribute_vector = attribute_vector.astype(float)
-        prob_vector = self.prob.copy()
-        label_probability_log = np.log(self.label_probability + 1)
+        self.compute_log_probabilities()
 
-        indexes_one = np.matrix(np.where(attribute_vector == 1.0)[1])
-        indexes_one = indexes_one.tolist()[0]
-        indexes_zero = np.matrix(np.where(attribute_vector == 0.0)[1])
-        indexes_zero = indexes_zero.tolist()[0]
+    def compute_log_probabilities(self):
+        prob = np.asarray(self.prob, dtype=float)
+        prob_present_log = np.log(1 + prob)
+        prob_absent_log = np.log(2 - prob)
 
-        prob_vector[:, indexes_one] = 1 + prob_vector[:, indexes_one]
-        prob_vector[:, indexes_zero] = 2 - prob_vector[:, indexes_zero]
+        self.features_log_weight = (prob_present_log - prob_absent_log).T
+        self.labels_log_bias = (
+            np.log(np.asarray(self.label_probability, dtype=float)[:, 0] + 1) +
+            prob_absent_log.sum(axis=1))
 
-        prob_vector = np.log(prob_vector)
-        prob_vector = prob_vector * np.ones((prob_vector.shape[1], 1))
-        prob_vector = label_probability_log + prob_vector
+    def get_classifications(self, attribute_matrix):
+        '''
+        Classify every row of a p x a binary attribute matrix with a single
+        matrix product, returning the list of labels of the p packages.
+        '''
+        if getattr(self, 'features_log_weight', None) is None:
+            self.compute_log_probabilities()
 
-        line, col = np.unravel_index(prob_vector.argmax(), prob_vector.shape)
-        best_prob_index = line
+        attribute_matrix = np.asarray(attribute_matrix, dtype=float)
+        labels_score = (attribute_matrix.dot(self.features_log_weight) +
+                        self.labels_log_bias)
 
-        return self.used_order_of_classifications[best_prob_index]
+        return [self.used_order_of_classifications[best_prob_index]
+                for best_prob_index in labels_score.argmax(axis=1)]
+
+    def get_classification(self, attribute_vector):
+        return self.get_classifications(attribute_vector)[0]
 
     def convert_possible_labels_to_number(self, order_of_classifications):
         numbers = ""
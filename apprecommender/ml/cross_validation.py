@@ -1,5 +1,4 @@
 import numpy as np
-import xapian
 
 from abc import ABCMeta
 from collections import defaultdict
@@ -10,6 +9,7 @@ from apprecommender.strategy import XAPIAN_DATABASE_PATH
 from apprecommender.ml.bag_of_words import BagOfWords
 from apprecommender.ml.bayes_matrix import BayesMatrix
 from apprecommender.ml.utils import create_column_matrix, create_binary_matrix
+from apprecommender.xapian_index import XapianIndexManager
 
 NOT_NECESSARY = 1
 
@@ -315,10 +315,10 @@ class CrossValidationBVA(CrossValidationMachineLearning):
 
         predicted_results = []
 
-        for pkg, input_vector in round_partition.iteritems():
-            input_vector = np.matrix(input_vector[:-1])
-            predicted_results.append(
-                round_user.get_classification(input_vector))
+        if round_partition:
+            input_matrix = np.matrix([input_vector[:-1] for input_vector
+                                      in round_partition.values()])
+            predicted_results = round_user.get_classifications(input_matrix)
 
         return create_column_matrix(predicted_results)
 
@@ -330,7 +330,7 @@ class CrossValidationBOW(CrossValidationMachineLearning):
         super(CrossValidationBOW, self).__init__(
             pkg_data, partition_proportion, rounds, metrics_list,
             labels)
-        self.axi = xapian.Database(XAPIAN_DATABASE_PATH)
+        self.axi = XapianIndexManager().get(XAPIAN_DATABASE_PATH)
         self.label = "Bag of words model"
 
     def get_model(self, cross_item_score):
@@ -9,6 +9,8 @@ from apprecommender.apt_cache import AptCache
 from apprecommender.config import Config
 from apprecommender.decider import FilterTag, FilterDescription
 from apprecommender.ml.pkg_time import PkgTime
+from apprecommender.term_matrix import PkgTermMatrix
+from apprecommender.xapian_index import XapianIndexManager
 
 
 class MachineLearningData():
@@ -25,15 +27,18 @@ class MachineLearningData():
     MACHINE_LEARNING_TRAINING = USER_DATA_DIR + 'machine_learning_training.txt'
 
     def __init__(self):
-        self.axi = xapian.Database(MachineLearningData.XAPIAN_DATABASE_PATH)
+        self.axi = XapianIndexManager().get(
+            MachineLearningData.XAPIAN_DATABASE_PATH)
         self.stemmer = Stemmer.Stemmer('english')
 
         valid_tags = []
         with open(path.join(Config().filters_dir, "debtags")) as tags:
             valid_tags = [line.strip() for line in tags
                           if not line.startswith("#")]
-        self.filter_tag = FilterTag(valid_tags)
-        self.filter_description = FilterDescription()
+        classification = PkgTermMatrix.get_classification(self.axi,
+                                                          valid_tags)
+        self.filter_tag = FilterTag(valid_tags, classification)
+        self.filter_description = FilterDescription(classification)
 
     def create_data(self, labels):
         if not path.exists(MachineLearningData.USER_DATA_DIR):
@@ -123,9 +128,50 @@ class MachineLearningData():
 
         return pkg_info
 
+    def get_pkgs_data(self, axi, pkgs_name, data_type):
+        """
+        Batch version of get_pkg_data, fetching the data of every package
+        of pkgs_name with a single xapian query.
+        """
+        pkgs_terms = set('XP' + pkg_name for pkg_name in pkgs_name)
+        pkgs_info = dict((pkg_name, []) for pkg_name in pkgs_name)
+
+        if not pkgs_terms:
+            return pkgs_info
+
+        query = xapian.Query(xapian.Query.OP_OR, list(pkgs_terms))
+        enquire = xapian.Enquire(axi)
+        enquire.set_query(query)
+
+        mset = enquire.get_mset(0, 10 * len(pkgs_terms))
+
+        for pkg in mset:
+            doc_pkgs, pkg_info = [], []
+
+            for term in axi.get_document(pkg.docid).termlist():
+
+                pkg_term = term.term
+
+                if pkg_term in pkgs_terms:
+                    doc_pkgs.append(pkg_term[2:])
+
+                if pkg_term.startswith(data_type):
+                    pkg_info.append(pkg_term[len(data_type):])
+                elif data_type == 'term':
+                    if pkg_term[0].islower():
+                        pkg_info.append(pkg_term)
+
+            for pkg_name in doc_pkgs:
+                pkgs_info[pkg_name].extend(pkg_info)
+
+        return pkgs_info
+
     def get_pkg_debtags(self, axi, pkg_name):
         return self.get_pkg_data(axi, pkg_name, 'XT')
 
+    def get_pkgs_debtags(self, axi, pkgs_name):
+        return self.get_pkgs_data(axi, pkgs_name, 'XT')
+
     def get_pkg_terms(self, cache, pkg_name):
         description = self.get_pkg_description(cache, pkg_name)
 
@@ -136,13 +182,13 @@ class MachineLearningData():
         return stems
 
     def get_pkg_section(self, cache, pkg_name):
-        return cache[pkg_name].section
+        return cache.get_section(pkg_name)
 
     def get_pkg_description(self, cache, pkg_name):
         if pkg_name not in cache:
             return []
         else:
-            description = cache[pkg_name].candidate.description
+            description = cache.get_description(pkg_name)
             return description.strip()
 
     def get_debtags_name(self, file_path):
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+import collections
+import hashlib
+import os
+import pickle
+import threading
+
+from apprecommender.singleton import Singleton
+
+Artifact = collections.namedtuple('Artifact', 'stat md5 value')
+
+
+class ModelRegistry(Singleton):
+
+    """
+    Process wide cache of the pickled machine learning artifacts. Every file
+    is unpickled once and only loaded again when its content changes.
+    """
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            self.lock = threading.Lock()
+            self.artifacts = {}
+            self.initialized = 1
+
+    @staticmethod
+    def get_file_stat(file_path):
+        try:
+            file_stat = os.stat(file_path)
+        except OSError as error:
+            raise IOError(error.errno, error.strerror, file_path)
+
+        return (file_stat.st_mtime, file_stat.st_size, file_stat.st_ino)
+
+    def get(self, file_path):
+        """
+        Return the object pickled on file_path. The file is read again only
+        if its mtime, size or inode changed, and unpickled again only if
+        its md5 changed too.
+        """
+        file_stat = ModelRegistry.get_file_stat(file_path)
+
+        with self.lock:
+            artifact = self.artifacts.get(file_path)
+
+            if artifact is not None and artifact.stat == file_stat:
+                return artifact.value
+
+            with open(file_path, 'rb') as artifact_file:
+                content = artifact_file.read()
+            md5 = hashlib.md5(content).hexdigest()
+
+            if artifact is not None and artifact.md5 == md5:
+                value = artifact.value
+            else:
+                value = pickle.loads(content)
+
+            self.artifacts[file_path] = Artifact(file_stat, md5, value)
+
+            return value
+
+    def clear(self):
+        with self.lock:
+            self.artifacts = {}
@@ -1,28 +1,84 @@
 #!/usr/bin/env python
 
-import commands
 import os
 import re
+import sqlite3
 
 from apprecommender.config import Config
-from apprecommender.data_classification import get_time_from_package
+from apprecommender.file_time import FileTimeService
+from apprecommender.pkg_files import PkgFilesIndex
 from apprecommender.user import LocalSystem
 from apprecommender.utils import print_progress_bar
 
 USER_DATA_DIR = Config().user_data_dir
 
 
+class PkgTimeStore:
+
+    """
+    Usage times of the user packages, stored with the files they were read
+    from and the mtime of the package dpkg list, which fingerprints these
+    files.
+    """
+
+    FIELDS = ['list_mtime', 'files', 'modify', 'access']
+
+    def __init__(self, db_path=USER_DATA_DIR + 'pkg_time.db'):
+        self.connection = sqlite3.connect(db_path)
+
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS pkgs (name TEXT PRIMARY KEY, '
+                'list_mtime REAL, files TEXT, modify INTEGER, '
+                'access INTEGER)')
+
+    def close(self):
+        self.connection.close()
+
+    def get_pkgs(self):
+        """
+        Return a dict with the stored fields of every package.
+        """
+        pkgs = {}
+        for row in self.connection.execute(
+                'SELECT name, list_mtime, files, modify, access FROM pkgs'):
+            fields = dict(zip(PkgTimeStore.FIELDS, row[1:]))
+            fields['files'] = fields['files'].splitlines()
+            pkgs[row[0]] = fields
+
+        return pkgs
+
+    def update(self, pkgs_fields, removed_pkgs=()):
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO pkgs VALUES (?, ?, ?, ?, ?)',
+                ((pkg, fields['list_mtime'], '\n'.join(fields['files']),
+                  fields['modify'], fields['access'])
+                 for pkg, fields in pkgs_fields.iteritems()))
+            self.connection.executemany(
+                'DELETE FROM pkgs WHERE name = ?',
+                ((pkg,) for pkg in removed_pkgs))
+
+
 class PkgTime:
 
-    def create_pkg_data(self):
+    def create_pkg_data(self, file_path=USER_DATA_DIR + 'pkg_data.txt'):
+        """
+        Return the usage times of the user packages. They are kept on the
+        package time store, and file_path is only written as an export for
+        inspection; it is never read back.
+        """
         user = LocalSystem()
         user_pkgs = user.pkg_profile
 
-        pkgs_time = self.get_packages_time(user_pkgs)
-        self.save_package_time(pkgs_time)
+        pkgs_time = self.update_packages_time(user_pkgs)
+        self.save_package_time(pkgs_time, file_path)
         return pkgs_time
 
-    def get_best_time(self, pkg):
+    def get_pkg_files(self, pkg):
+        """
+        Return the files of the package whose times may tell its usage.
+        """
         valid_path_regex = re.compile(
             r'/usr/bin/|/usr/game/|/usr/lib/.+/')
         invalid_path_regex = re.compile(
@@ -30,10 +86,8 @@ class PkgTime:
         invalid_files_regex = re.compile(
             r'\.desktop|\.conf|\.egg-info|\.txt')
 
-        pkg_files = commands.getoutput('dpkg -L {}'.format(pkg))
-
-        bestatime, bestmtime = 0, 0
-        for pkg_file in pkg_files.splitlines():
+        pkg_files = []
+        for pkg_file in PkgFilesIndex().get_files(pkg):
             if invalid_path_regex.search(pkg_file):
                 continue
 
@@ -44,52 +98,75 @@ class PkgTime:
                 continue
 
             if valid_path_regex.search(pkg_file):
-                modify, access = get_time_from_package(pkg_file,
-                                                       pkg_bin=False)
+                pkg_files.append(pkg_file)
+
+        return pkg_files
+
+    def get_files_best_time(self, pkg_files):
+        """
+        Return the times of the most recently accessed file, read with one
+        lstat each, bypassing the FileTimeService cache.
+        """
+        bestatime, bestmtime = 0, 0
+        for pkg_file in pkg_files:
+            modify, access = FileTimeService().read_times(pkg_file,
+                                                          is_binary=False)
 
-                modify = int(modify) if modify else 0
-                access = int(access) if access else 0
+            modify = int(modify) if modify else 0
+            access = int(access) if access else 0
 
-                if access > bestatime:
-                    bestatime = access
-                    bestmtime = modify
+            if access > bestatime:
+                bestatime = access
+                bestmtime = modify
 
         return (bestmtime, bestatime)
 
     def get_package_data(self, file_path=USER_DATA_DIR + 'pkg_data.txt'):
-        if os.path.isfile(file_path):
-            pkgs_time = {}
-
-            with open(file_path, 'r') as pkg_data:
-                for pkg_line in pkg_data:
-                    name, modify, access = pkg_line.split(' ')
-                    pkgs_time[name] = [modify, access]
+        return self.create_pkg_data(file_path)
+
+    def get_pkg_fields(self, pkg, fields=None):
+        """
+        Return the fields of the package to be stored. The files of the
+        package are only looked up again if its dpkg list has changed since
+        fields were computed, while their times are always read again.
+        """
+        list_mtime = PkgFilesIndex().get_list_mtime(pkg)
+
+        if fields is None or fields['list_mtime'] != list_mtime:
+            pkg_files = self.get_pkg_files(pkg)
+        else:
+            pkg_files = fields['files']
 
-            return pkgs_time
+        modify, access = self.get_files_best_time(pkg_files)
 
-        else:
-            return self.create_pkg_data()
+        return pkg, {'list_mtime': list_mtime, 'files': pkg_files,
+                     'modify': modify, 'access': access}
 
-    def get_packages_time(self, pkgs, verbose=False):
-        pkgs_time = {}
+    def update_packages_time(self, pkgs,
+                             db_path=USER_DATA_DIR + 'pkg_time.db'):
+        """
+        Return the usage times of pkgs, merged into the package time store.
+        Only the packages installed or upgraded since the last update have
+        their files looked up again, and the removed ones are dropped.
+        """
+        store = PkgTimeStore(db_path)
+        stored_pkgs = store.get_pkgs()
 
         len_pkgs = len(pkgs)
-        for index, pkg in enumerate(pkgs):
-            modify, access = self.get_best_time(pkg)
+        pkgs_fields = FileTimeService().imap_unordered(
+            lambda pkg: self.get_pkg_fields(pkg, stored_pkgs.get(pkg)), pkgs)
 
-            if modify and access:
-                if verbose:
-                    print 'ADD: {}'.format(pkg)
-
-                pkgs_time[pkg] = []
-                pkgs_time[pkg].append(modify)
-                pkgs_time[pkg].append(access)
-            else:
-                if verbose:
-                    print 'NOT: {} {} {}'.format(pkg, modify, access)
+        pkgs_time, updated_pkgs = {}, {}
+        for index, (pkg, fields) in enumerate(pkgs_fields):
+            updated_pkgs[pkg] = fields
+            if fields['modify'] and fields['access']:
+                pkgs_time[pkg] = [fields['modify'], fields['access']]
 
             print_progress_bar(index + 1, len_pkgs)
 
+        store.update(updated_pkgs, set(stored_pkgs) - set(pkgs))
+        store.close()
+
         return pkgs_time
 
     def print_package_time(self, pkgs_time):
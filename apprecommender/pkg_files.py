@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+
+import glob
+import logging
+import os
+import pickle
+import re
+import threading
+
+from apprecommender.config import Config
+from apprecommender.singleton import Singleton
+
+
+class PkgFilesIndex(Singleton):
+
+    """
+    Persistent index of the executable and library files of the installed
+    packages, read from the dpkg info lists. Only the lists modified since
+    the last update are read again, so dpkg -L is not needed.
+    """
+
+    INFO_DIR = '/var/lib/dpkg/info'
+    INDEX_FILE = 'pkg_files_index.pickle'
+
+    INDEXED_PATH_REGEX = re.compile(r'/usr/(s?bin|games?|lib)/')
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            self.lock = threading.Lock()
+            self.index_path = os.path.join(Config().user_data_dir,
+                                           PkgFilesIndex.INDEX_FILE)
+            self.lists = None
+            self.pkgs_lists = {}
+            self.info_mtime = None
+            self.initialized = 1
+
+    def load(self):
+        try:
+            with open(self.index_path, 'rb') as index_file:
+                return pickle.load(index_file)
+        except (IOError, EOFError, ValueError, pickle.UnpicklingError):
+            return {}
+
+    def save(self):
+        try:
+            with open(self.index_path, 'wb') as index_file:
+                pickle.dump(self.lists, index_file)
+        except (IOError, OSError):
+            logging.debug("Could not save package files index on %s"
+                          % self.index_path)
+
+    def read_list(self, list_path):
+        """
+        Return the indexed paths of a dpkg info list.
+        """
+        with open(list_path) as list_file:
+            return [path.rstrip('\n') for path in list_file
+                    if PkgFilesIndex.INDEXED_PATH_REGEX.search(path)]
+
+    def update(self):
+        try:
+            info_mtime = os.path.getmtime(PkgFilesIndex.INFO_DIR)
+        except OSError:
+            info_mtime = None
+
+        with self.lock:
+            if self.lists is not None and info_mtime == self.info_mtime:
+                return
+
+            if self.lists is None:
+                self.lists = self.load()
+
+            lists = {}
+            for list_path in glob.glob(os.path.join(PkgFilesIndex.INFO_DIR,
+                                                    '*.list')):
+                try:
+                    mtime = os.path.getmtime(list_path)
+                    pkg_list = self.lists.get(list_path)
+                    if pkg_list is None or pkg_list['mtime'] != mtime:
+                        pkg_list = {'mtime': mtime,
+                                    'files': self.read_list(list_path)}
+                except (IOError, OSError):
+                    continue
+
+                lists[list_path] = pkg_list
+
+            changed = (set(lists) != set(self.lists) or
+                       any(lists[list_path] is not self.lists[list_path]
+                           for list_path in lists))
+            self.lists = lists
+            self.info_mtime = info_mtime
+
+            # Lists of multiarch packages are named pkg:arch.list
+            self.pkgs_lists = {}
+            for list_path in lists:
+                pkg = os.path.basename(list_path)[:-len('.list')]
+                self.pkgs_lists.setdefault(pkg.split(':')[0],
+                                           []).append(list_path)
+
+            if changed:
+                self.save()
+
+    def get_files(self, pkg):
+        """
+        Return the executable and library files of the package, as listed
+        by dpkg -L.
+        """
+        self.update()
+
+        files = []
+        for list_path in self.pkgs_lists.get(pkg, []):
+            files.extend(self.lists[list_path]['files'])
+
+        return files
+
+    def get_list_mtime(self, pkg):
+        """
+        Return the last modification time of the package lists, or None if
+        the package is not installed.
+        """
+        self.update()
+
+        mtimes = [self.lists[list_path]['mtime']
+                  for list_path in self.pkgs_lists.get(pkg, [])]
+
+        return max(mtimes) if mtimes else None
+
+    def get_binaries(self, pkg):
+        """
+        Return the files of the package on /usr/bin/, or on /usr/sbin/ if
+        there is none.
+        """
+        files = self.get_files(pkg)
+
+        binaries = [path for path in files if '/usr/bin/' in path]
+        if not binaries:
+            binaries = [path for path in files if '/usr/sbin/' in path]
+
+        return binaries
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+
+import logging
+import os
+import sqlite3
+
+from apprecommender.config import Config
+
+
+class PkgMetadata:
+
+    """
+    Read optimized copy of the apt fields used by the recommender. It is
+    compiled by Initialize.prepare_data and becomes stale when the apt lists
+    change, so apt.Cache does not need to be loaded on the recommendation
+    path. The candidate fields do not depend on the dpkg status.
+    """
+
+    LISTS_DIR = '/var/lib/apt/lists'
+    SOURCES = [LISTS_DIR, '/var/lib/dpkg/status']
+    FIELDS = ['summary', 'description', 'section', 'tags', 'dependencies',
+              'or_dependencies']
+
+    @staticmethod
+    def get_sources_mtime():
+        mtimes = [os.path.getmtime(path) for path in PkgMetadata.SOURCES
+                  if os.path.exists(path)]
+
+        return max(mtimes) if mtimes else 0.0
+
+    @staticmethod
+    def get_lists_mtime():
+        if not os.path.exists(PkgMetadata.LISTS_DIR):
+            return 0.0
+
+        return os.path.getmtime(PkgMetadata.LISTS_DIR)
+
+    @staticmethod
+    def get_pkg_row(pkg):
+        candidate = pkg.candidate
+
+        if candidate is None:
+            return (pkg.name, 0) + (None,) * len(PkgMetadata.FIELDS)
+
+        dependencies = [dep[0].name for dep in candidate.dependencies]
+        or_dependencies = [or_dep.name for dep in candidate.dependencies
+                           for or_dep in dep.or_dependencies]
+
+        return (pkg.name, 1, candidate.summary, candidate.description,
+                candidate.section, candidate.record.get('Tag', None),
+                ' '.join(dependencies), ' '.join(or_dependencies))
+
+    @staticmethod
+    def build(cache, axi, db_path):
+        """
+        Compile the fields of every package of cache that is also on the
+        axi index into the sqlite database on db_path. The database is
+        written aside and renamed, so readers never see a partial one.
+        """
+        build_path = '{}.{}.tmp'.format(db_path, os.getpid())
+        if os.path.exists(build_path):
+            os.remove(build_path)
+
+        lists_mtime = PkgMetadata.get_lists_mtime()
+        connection = sqlite3.connect(build_path)
+
+        with connection:
+            connection.execute(
+                'CREATE TABLE pkgs (name TEXT PRIMARY KEY, '
+                'has_candidate INTEGER, summary TEXT, description TEXT, '
+                'section TEXT, tags TEXT, dependencies TEXT, '
+                'or_dependencies TEXT)')
+            connection.execute('CREATE TABLE info (lists_mtime REAL)')
+            connection.execute('INSERT INTO info VALUES (?)',
+                               (lists_mtime,))
+            connection.executemany(
+                'INSERT INTO pkgs VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (PkgMetadata.get_pkg_row(pkg) for pkg in cache
+                 if axi.get_termfreq('XP' + pkg.name) > 0))
+
+        num_pkgs = connection.execute(
+            'SELECT COUNT(*) FROM pkgs').fetchone()[0]
+        connection.close()
+        os.rename(build_path, db_path)
+
+        logging.info("Package metadata: %d packages" % num_pkgs)
+
+    @staticmethod
+    def get(db_path=None):
+        """
+        Return the package metadata on db_path, or None if it was not
+        compiled or is outdated.
+        """
+        db_path = db_path or Config().pkg_metadata
+
+        if not os.path.exists(db_path):
+            return None
+
+        try:
+            metadata = PkgMetadata(db_path)
+        except sqlite3.DatabaseError:
+            logging.warning("Could not load package metadata from %s"
+                            % db_path)
+            return None
+
+        if metadata.lists_mtime != PkgMetadata.get_lists_mtime():
+            logging.info("Package metadata is outdated")
+            metadata.close()
+            return None
+
+        return metadata
+
+    def __init__(self, db_path):
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.lists_mtime = self.connection.execute(
+            'SELECT lists_mtime FROM info').fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+    def get_pkg_info(self, pkg_name):
+        """
+        Return a dict with every field of the package. Packages missing on
+        the metadata are neither on the axi index nor on the apt cache.
+        """
+        row = self.connection.execute(
+            'SELECT has_candidate, summary, description, section, tags, '
+            'dependencies, or_dependencies FROM pkgs WHERE name = ?',
+            (pkg_name,)).fetchone()
+
+        if row is None:
+            pkg_info = dict.fromkeys(PkgMetadata.FIELDS)
+            pkg_info.update({'in_cache': False, 'has_candidate': False})
+            return pkg_info
+
+        pkg_info = dict(zip(PkgMetadata.FIELDS, row[1:]))
+        pkg_info.update({'in_cache': True, 'has_candidate': bool(row[0])})
+
+        for field in ('dependencies', 'or_dependencies'):
+            if pkg_info[field] is not None:
+                pkg_info[field] = pkg_info[field].split()
+
+        return pkg_info
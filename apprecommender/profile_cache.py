@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+
+import collections
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+from apprecommender.config import Config
+
+
+class ProfileCache:
+
+    """
+    Persistent LRU cache of user content profiles, stored on user_data_dir.
+    Profiles are keyed by everything used to compute them: the package
+    profile, content type, size, valid tags and the items repository
+    revision. The cache is only written when a profile is set, and then
+    replaced atomically, so concurrent runs never leave a partial file.
+    """
+
+    CACHE_FILE = 'profile_cache.pickle'
+
+    def __init__(self, cache_path=None, max_profiles=None):
+        config = Config()
+        self.cache_path = cache_path or os.path.join(
+            config.user_data_dir, ProfileCache.CACHE_FILE)
+
+        if max_profiles is None:
+            max_profiles = config.profile_cache_size
+        self.max_profiles = max_profiles
+
+        self.profiles = self.load() if self.max_profiles else None
+
+    @staticmethod
+    def get_key(items_repository, pkg_profile, content, size, valid_tags=0,
+                time_context=0):
+        index_info = (items_repository.get_uuid(),
+                      items_repository.get_doccount(),
+                      items_repository.get_lastdocid())
+        valid_tags = sorted(valid_tags) if valid_tags else []
+
+        key = repr((sorted(pkg_profile), content, size, valid_tags,
+                    time_context, index_info))
+
+        return hashlib.sha1(key).hexdigest()
+
+    def load(self):
+        try:
+            with open(self.cache_path, 'rb') as cache_file:
+                profiles = pickle.load(cache_file)
+        except (IOError, EOFError, ValueError, pickle.UnpicklingError):
+            return collections.OrderedDict()
+
+        if not isinstance(profiles, collections.OrderedDict):
+            return collections.OrderedDict()
+
+        return profiles
+
+    def save(self):
+        temp_path = None
+
+        try:
+            temp_fd, temp_path = tempfile.mkstemp(
+                prefix=os.path.basename(self.cache_path) + '.',
+                dir=os.path.dirname(self.cache_path))
+            with os.fdopen(temp_fd, 'wb') as cache_file:
+                pickle.dump(self.profiles, cache_file)
+            os.rename(temp_path, self.cache_path)
+        except (IOError, OSError):
+            logging.debug("Could not save profile cache on %s"
+                          % self.cache_path)
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def get(self, key):
+        if not self.max_profiles or key not in self.profiles:
+            return None
+
+        # The recency is only persisted by the next set
+        if next(reversed(self.profiles)) != key:
+            self.profiles[key] = self.profiles.pop(key)
+
+        return list(self.profiles[key])
+
+    def set(self, key, profile):
+        if not self.max_profiles:
+            return
+
+        self.profiles.pop(key, None)
+        self.profiles[key] = list(profile)
+
+        while len(self.profiles) > self.max_profiles:
+            self.profiles.popitem(last=False)
+
+        self.save()
@@ -34,6 +34,9 @@ import apprecommender.strategy
 
 from apprecommender.apt_cache import AptCache
 from apprecommender.config import Config
+from apprecommender.xapian_index import XapianIndexManager
+
+RankedItem = namedtuple('RankedItem', ['package', 'score', 'rank'])
 
 
 class RecommendationResult:
@@ -58,20 +61,18 @@ class RecommendationResult:
 
     def fill_pkg_descriptions(self, user_profile):
         for pkg in user_profile:
-            description = self.cache[pkg].candidate.description
+            description = self.cache.get_description(pkg)
             self.pkg_descriptions[pkg] = description.lower()
 
     def __str__(self):
         """
         String representation of the object.
         """
-        result = self.get_prediction(self.limit)
         rec_str = '\n'
-        index = 1
 
-        for pkg, _ in result:
-            summary = self.cache[pkg].candidate.summary
-            description = self.cache[pkg].candidate.description
+        for pkg, _, index in self.ranked_items():
+            summary = self.cache.get_summary(pkg)
+            description = self.cache.get_description(pkg)
             rec_str += '{}: {} \t {}\n'.format(
                 index, pkg.ljust(20), summary)
 
@@ -80,8 +81,6 @@ class RecommendationResult:
                 rec_str += '   because you installed: \t {}\n\n'.format(
                     ', '.join(because_pkgs))
 
-            index += 1
-
         return rec_str
 
     def get_because(self, rec_description):
@@ -106,6 +105,17 @@ class RecommendationResult:
 
         return list(reversed(sorted_result[-limit:]))
 
+    def ranked_items(self, limit=None):
+        """
+        Iterate over the prediction as RankedItem records, ranked from 1 in
+        the same order of the string representation.
+        """
+        if limit is None:
+            limit = self.limit
+
+        for rank, (pkg, score) in enumerate(self.get_prediction(limit), 1):
+            yield RankedItem(pkg, score, rank)
+
 
 class Recommender:
     """
@@ -118,10 +128,10 @@ class Recommender:
         self.cfg = Config()
 
         # Load xapian indexes
-        self.axi_desktopapps = xapian.Database(self.cfg.axi_desktopapps)
+        indexes = XapianIndexManager()
+        self.axi_desktopapps = indexes.get(self.cfg.axi_desktopapps)
         if self.cfg.popcon:
-            self.popcon_desktopapps = xapian.Database(
-                self.cfg.popcon_desktopapps)
+            self.popcon_desktopapps = indexes.get(self.cfg.popcon_desktopapps)
 
         # Load valid programs, desktopapps and tags
         # format: one package or tag name per line
@@ -166,6 +176,9 @@ class Recommender:
         valid_strategies = self.get_all_strategies()
         profile_size = n if n else self.cfg.profile_size
 
+        # Long running recommenders pick up the indexes rebuilt by --init
+        self.axi_desktopapps = XapianIndexManager().get(
+            self.cfg.axi_desktopapps)
         self.items_repository = self.axi_desktopapps
         self.valid_pkgs = self.valid_desktopapps
         logging.info("Setting recommender strategy to \'%s\'" % strategy_str)
@@ -23,10 +23,7 @@ __license__ = """
 import collections
 import logging
 import operator
-import pickle
-import re
 import recommender
-import subprocess
 import xapian
 
 import numpy as np
@@ -35,12 +32,15 @@ from abc import ABCMeta, abstractmethod
 
 from apprecommender.apt_cache import AptCache
 from apprecommender.config import Config
-from apprecommender.decider import (PkgMatchDecider,
+from apprecommender.decider import (PkgMatchDecider, PkgMatchFilter,
                                     PkgReverseDependeciesDecider)
+from apprecommender.dependency_graph import DependencyGraph
 from apprecommender.ml.bag_of_words import BagOfWords
+from apprecommender.ml.model_registry import ModelRegistry
 from apprecommender.ml.bayes_matrix import BayesMatrix
 from apprecommender.ml.data import MachineLearningData
 from apprecommender.utils import get_class_and_module_name
+from apprecommender.xapian_index import XapianIndexManager
 
 XAPIAN_DATABASE_PATH = Config().axi_desktopapps
 USER_DATA_DIR = Config().user_data_dir
@@ -89,14 +89,24 @@ class ContentBased(RecommendationStrategy):
 
     def get_sugestion_from_profile(self, rec, user, profile,
                                    recommendation_size, because=True,
-                                   pkg_decider=None):
+                                   pkg_decider=None, pkg_filter=None,
+                                   items_repository=None):
+        if items_repository is None:
+            items_repository = rec.items_repository
         query = xapian.Query(xapian.Query.OP_OR, profile)
-        enquire = xapian.Enquire(rec.items_repository)
+        if pkg_filter is not None:
+            query = pkg_filter.filter_query(query)
+        elif pkg_decider is None:
+            if PkgMatchFilter.is_indexed(items_repository):
+                query = PkgMatchFilter(user.installed_pkgs).filter_query(
+                    query)
+            else:
+                pkg_decider = PkgMatchDecider(user.installed_pkgs)
+
+        enquire = xapian.Enquire(items_repository)
         enquire.set_weighting_scheme(rec.weight)
         enquire.set_query(query)
         user_profile = None
-        if pkg_decider is None:
-            pkg_decider = PkgMatchDecider(user.installed_pkgs)
 
         # Retrieve matching packages
         try:
@@ -146,19 +156,9 @@ class PackageReference(ContentBased):
         self.description = 'Package-reference'
         self.profile_size = profile_size
         self.cache = AptCache()
-        self.pkgs_regex = re.compile(r'^\s+(?:\|)?(.+)$', re.MULTILINE)
 
     def get_reverse_dependencies_pkgs(self, reference_pkgs):
-        reverse_dependencies_pkgs = []
-        for pkg in reference_pkgs:
-            command = 'apt-cache rdepends {}'.format(pkg)
-            rdepends = subprocess.check_output(command,
-                                               stderr=subprocess.STDOUT,
-                                               shell=True)
-            rdepends_pkgs = self.pkgs_regex.findall(rdepends)
-            reverse_dependencies_pkgs += rdepends_pkgs
-
-        return reverse_dependencies_pkgs
+        return DependencyGraph.get().get_reverse_dependencies(reference_pkgs)
 
     def content_profile_for_reference_pkgs(self, reference_pkgs):
         content_profile = reference_pkgs[:]
@@ -174,16 +174,17 @@ class PackageReference(ContentBased):
         reverse_dependencies_pkgs = self.get_reverse_dependencies_pkgs(
             reference_pkgs)
 
-        pkg_decider = PkgReverseDependeciesDecider(reverse_dependencies_pkgs,
-                                                   user.installed_pkgs)
+        pkg_filter = PkgReverseDependeciesDecider(reverse_dependencies_pkgs,
+                                                  user.installed_pkgs)
 
         profile = user.content_profile(rec.items_repository, self.content,
                                        self.profile_size, rec.valid_tags)
         profile += self.content_profile_for_reference_pkgs(reference_pkgs)
 
-        rec.items_repository = xapian.Database(Config().axi)
+        axi = XapianIndexManager().get(Config().axi)
         result = self.get_sugestion_from_profile(
-            rec, user, profile, rec_size, pkg_decider=pkg_decider)
+            rec, user, profile, rec_size, pkg_filter=pkg_filter,
+            items_repository=axi)
 
         return result
 
@@ -211,7 +212,7 @@ class MachineLearning(ContentBased):
         self.suggestion_size = suggestion_size
         self.cache = AptCache()
         self.ml_data = MachineLearningData()
-        self.axi = xapian.Database(XAPIAN_DATABASE_PATH)
+        self.axi = XapianIndexManager().get(XAPIAN_DATABASE_PATH)
 
     def display_recommended_terms(self, terms_name, debtags_name, item_score,
                                   rec_size):
@@ -262,53 +263,36 @@ class MachineLearning(ContentBased):
             rec, user, profile, self.suggestion_size, because=False)
         pkgs, pkgs_score = [], {}
 
-        for pkg_line in str(content_based).splitlines()[1:]:
-            pkg = re.search(r'\d+:\s([\w-]+)', pkg_line)
-
-            if not pkg.groups():
-                continue
-
-            pkg = pkg.groups()[0]
-            pkg_score = int(pkg_line.split(':')[0].strip())
-
-            pkgs.append(pkg)
-            pkgs_score[pkg] = self.suggestion_size - pkg_score
+        for item in content_based.ranked_items():
+            pkgs.append(item.package)
+            pkgs_score[item.package] = self.suggestion_size - item.rank
 
         return pkgs, pkgs_score
 
     def get_pkgs_classifications(self, pkgs, terms_name, debtags_name):
         ml_strategy = self.get_ml_strategy()
-        pkgs_classifications = {}
         kwargs = {}
 
         kwargs['terms_name'] = terms_name
         kwargs['debtags_name'] = debtags_name
         kwargs['ml_strategy'] = ml_strategy
 
-        for pkg in pkgs:
-            if pkg not in self.cache:
-                continue
+        pkgs = [pkg for pkg in pkgs if pkg in self.cache]
+        attribute_vectors = self.prepare_pkgs_data(pkgs, **kwargs)
 
-            attribute_vector = self.prepare_pkg_data(
-                pkg, **kwargs)
+        if not attribute_vectors:
+            return {}
 
-            classification = self.get_pkg_classification(
-                ml_strategy, attribute_vector)
-            pkgs_classifications[pkg] = classification
+        classifications = self.get_pkgs_classification(
+            ml_strategy, attribute_vectors)
 
-        return pkgs_classifications
+        return dict(zip(pkgs, classifications))
 
     def load_terms_and_debtags(self):
-        terms_name = []
-        debtags_name = []
-
-        terms_path = self.get_terms_path()
-        debtags_path = self.get_debtags_path()
+        model_registry = ModelRegistry()
 
-        with open(terms_path, 'rb') as terms:
-            terms_name = pickle.load(terms)
-        with open(debtags_path, 'rb') as debtags:
-            debtags_name = pickle.load(debtags)
+        terms_name = model_registry.get(self.get_terms_path())
+        debtags_name = model_registry.get(self.get_debtags_path())
 
         return terms_name, debtags_name
 
@@ -336,7 +320,7 @@ class MachineLearning(ContentBased):
         raise NotImplementedError("Method not implemented.")
 
     @abstractmethod
-    def get_pkg_classification(self, ml_strategy, attribute_vector):
+    def get_pkgs_classification(self, ml_strategy, attribute_vectors):
         raise NotImplementedError("Method not implemented.")
 
     @abstractmethod
@@ -347,6 +331,9 @@ class MachineLearning(ContentBased):
     def prepare_pkg_data(self, pkg, **kwargs):
         raise NotImplementedError("Method not implemented.")
 
+    def prepare_pkgs_data(self, pkgs, **kwargs):
+        return [self.prepare_pkg_data(pkg, **kwargs) for pkg in pkgs]
+
     @abstractmethod
     def run_train(cls, pkgs_classifications):
         raise NotImplementedError("Method not implemented.")
@@ -404,11 +391,11 @@ class MachineLearningBVA(MachineLearning):
         return MachineLearningData.MACHINE_LEARNING_DEBTAGS
 
     def get_ml_strategy(self):
-        return BayesMatrix.load(
+        return ModelRegistry().get(
             MachineLearningData.MACHINE_LEARNING_TRAINING)
 
-    def get_pkg_classification(self, ml_strategy, attribute_vector):
-        return ml_strategy.get_classification(attribute_vector)
+    def get_pkgs_classification(self, ml_strategy, attribute_vectors):
+        return ml_strategy.get_classifications(np.vstack(attribute_vectors))
 
     def get_terms_path(self):
         return MachineLearningData.MACHINE_LEARNING_TERMS
@@ -451,11 +438,10 @@ class MachineLearningBOW(MachineLearning):
         return BagOfWords.BAG_OF_WORDS_DEBTAGS
 
     def get_ml_strategy(self):
-        return BagOfWords.load(
-            BagOfWords.BAG_OF_WORDS_MODEL)
+        return ModelRegistry().get(BagOfWords.BAG_OF_WORDS_MODEL)
 
-    def get_pkg_classification(self, ml_strategy, attribute_vector):
-        return ml_strategy.classify_pkg(attribute_vector)
+    def get_pkgs_classification(self, ml_strategy, attribute_vectors):
+        return ml_strategy.classify_pkgs(attribute_vectors)
 
     def get_terms_path(self):
         return BagOfWords.BAG_OF_WORDS_TERMS
@@ -467,11 +453,17 @@ class MachineLearningBOW(MachineLearning):
             pkg, self.axi, self.cache, self.ml_data)
         return attribute_vector
 
+    def prepare_pkgs_data(self, pkgs, **kwargs):
+        ml_strategy = kwargs['ml_strategy']
+
+        return ml_strategy.create_pkgs_data(
+            pkgs, self.axi, self.cache, self.ml_data)
+
     @classmethod
     def run_train(cls, pkgs_classifications):
         bag_of_words = BagOfWords()
         pkgs_list = pkgs_classifications.keys()
-        axi = xapian.Database(XAPIAN_DATABASE_PATH)
+        axi = XapianIndexManager().get(XAPIAN_DATABASE_PATH)
 
         bag_of_words.train_model(pkgs_list, axi)
         BagOfWords.save(bag_of_words, BagOfWords.BAG_OF_WORDS_MODEL)
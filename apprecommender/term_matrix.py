@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+
+import logging
+import os
+import pickle
+import shutil
+import xapian
+
+import numpy as np
+
+from apprecommender.config import Config
+from apprecommender.data_classification import terms_time_weight
+from apprecommender.decider import FilterAny, TermClassification
+
+
+class PkgTermMatrix:
+
+    """
+    Compact package by term matrix of an items repository. Rows are stored
+    in CSR format with integer term ids, so the terms of a package are read
+    by slicing memory mapped arrays instead of walking xapian termlists.
+    """
+
+    INDPTR_FILE = 'indptr.npy'
+    INDICES_FILE = 'indices.npy'
+    IDF_FILE = 'idf.npy'
+    ROWS_FILE = 'rows.npy'
+    TERMS_FILE = 'terms.pickle'
+    INFO_FILE = 'info.pickle'
+    FLAGS_FILE = 'flags.npy'
+    FLAGS_KEY_FILE = 'flags_key.pickle'
+
+    loaded = None
+
+    @staticmethod
+    def get_index_info(index):
+        return {'uuid': index.get_uuid(),
+                'doccount': index.get_doccount(),
+                'lastdocid': index.get_lastdocid()}
+
+    @staticmethod
+    def build(index, matrix_dir, valid_tags=None):
+        """
+        Extract the package by term matrix of index into matrix_dir, with
+        the classification of its terms for valid_tags.
+        """
+        if os.path.exists(matrix_dir):
+            shutil.rmtree(matrix_dir)
+        os.makedirs(matrix_dir)
+
+        terms, terms_ids = [], {}
+        pkgs, indptr, indices = [], [0], []
+        rows = np.empty(index.get_lastdocid() + 1, dtype=np.int32)
+        rows.fill(-1)
+
+        for docid in range(1, index.get_lastdocid() + 1):
+            try:
+                doc = index.get_document(docid)
+            except xapian.DocNotFoundError:
+                continue
+
+            rows[docid] = len(pkgs)
+            pkgs.append(doc.get_data())
+
+            for term in doc.termlist():
+                if term.term not in terms_ids:
+                    terms_ids[term.term] = len(terms)
+                    terms.append(term.term)
+                indices.append(terms_ids[term.term])
+
+            indptr.append(len(indices))
+
+        indices = np.array(indices, dtype=np.int32)
+        termfreq = np.bincount(indices, minlength=len(terms))
+        idf = np.log(index.get_doccount() / termfreq.astype(float))
+
+        np.save(os.path.join(matrix_dir, PkgTermMatrix.INDPTR_FILE),
+                np.array(indptr, dtype=np.int32))
+        np.save(os.path.join(matrix_dir, PkgTermMatrix.INDICES_FILE), indices)
+        np.save(os.path.join(matrix_dir, PkgTermMatrix.IDF_FILE), idf)
+        np.save(os.path.join(matrix_dir, PkgTermMatrix.ROWS_FILE), rows)
+
+        with open(os.path.join(matrix_dir, PkgTermMatrix.TERMS_FILE),
+                  'wb') as terms_file:
+            pickle.dump((terms, pkgs), terms_file)
+
+        flags = TermClassification.classify_terms(terms, valid_tags)
+        np.save(os.path.join(matrix_dir, PkgTermMatrix.FLAGS_FILE),
+                np.array(flags, dtype=np.uint8))
+
+        with open(os.path.join(matrix_dir, PkgTermMatrix.FLAGS_KEY_FILE),
+                  'wb') as flags_key_file:
+            pickle.dump(TermClassification.get_tags_key(valid_tags),
+                        flags_key_file)
+
+        with open(os.path.join(matrix_dir, PkgTermMatrix.INFO_FILE),
+                  'wb') as info_file:
+            pickle.dump(PkgTermMatrix.get_index_info(index), info_file)
+
+        logging.info("Package term matrix: %d packages, %d terms" %
+                     (len(pkgs), len(terms)))
+
+    @staticmethod
+    def get(index, matrix_dir=None):
+        """
+        Return the matrix extracted from index, or None if there is no
+        matrix for it.
+        """
+        matrix_dir = matrix_dir or Config().term_matrix_dir
+        info_path = os.path.join(matrix_dir, PkgTermMatrix.INFO_FILE)
+
+        try:
+            mtime = os.path.getmtime(info_path)
+        except OSError:
+            return None
+
+        matrix = PkgTermMatrix.loaded
+        if (matrix is None or matrix.matrix_dir != matrix_dir or
+                matrix.mtime != mtime):
+            try:
+                matrix = PkgTermMatrix(matrix_dir)
+            except (IOError, ValueError):
+                logging.warning("Could not load package term matrix from %s"
+                                % matrix_dir)
+                return None
+            matrix.mtime = mtime
+            PkgTermMatrix.loaded = matrix
+
+        if matrix.info != PkgTermMatrix.get_index_info(index):
+            return None
+
+        return matrix
+
+    @staticmethod
+    def get_classification(index, valid_tags):
+        """
+        Return the classification of the terms of index for valid_tags, or
+        None if it was not compiled.
+        """
+        matrix = PkgTermMatrix.get(index)
+        if matrix:
+            return matrix.get_term_classification(valid_tags)
+        return None
+
+    def __init__(self, matrix_dir):
+        self.matrix_dir = matrix_dir
+        self.mtime = 0
+
+        self.indptr = self.load_array(PkgTermMatrix.INDPTR_FILE)
+        self.indices = self.load_array(PkgTermMatrix.INDICES_FILE)
+        self.idf = self.load_array(PkgTermMatrix.IDF_FILE)
+        self.rows = self.load_array(PkgTermMatrix.ROWS_FILE)
+
+        with open(os.path.join(matrix_dir, PkgTermMatrix.TERMS_FILE),
+                  'rb') as terms_file:
+            self.terms, self.pkgs = pickle.load(terms_file)
+
+        with open(os.path.join(matrix_dir, PkgTermMatrix.INFO_FILE),
+                  'rb') as info_file:
+            self.info = pickle.load(info_file)
+
+        self.classification = None
+        self.flags_key = None
+        self.flags = None
+
+        # Matrices extracted before terms were classified have no flags
+        if os.path.exists(os.path.join(matrix_dir,
+                                       PkgTermMatrix.FLAGS_KEY_FILE)):
+            with open(os.path.join(matrix_dir, PkgTermMatrix.FLAGS_KEY_FILE),
+                      'rb') as flags_key_file:
+                self.flags_key = pickle.load(flags_key_file)
+            self.flags = self.load_array(PkgTermMatrix.FLAGS_FILE)
+
+    def get_term_classification(self, valid_tags):
+        if self.flags_key != TermClassification.get_tags_key(valid_tags):
+            return None
+
+        if self.classification is None:
+            self.classification = TermClassification(self.terms, self.flags)
+
+        return self.classification
+
+    def load_array(self, file_name):
+        return np.load(os.path.join(self.matrix_dir, file_name),
+                       mmap_mode='r')
+
+    def get_row(self, docid):
+        row = self.rows[docid]
+        return self.indices[self.indptr[row]:self.indptr[row + 1]]
+
+    def get_pkg(self, docid):
+        return self.pkgs[self.rows[docid]]
+
+    def get_doc_terms(self, docid):
+        return [self.terms[term_id] for term_id in self.get_row(docid)]
+
+    def get_terms_wdf(self, docids, normalized_weights=None):
+        """
+        Return the ids of the terms found on docids and a vector with the
+        wdf every term would have if all documents were merged in one.
+        """
+        rows_terms = [self.get_row(docid) for docid in docids]
+        if rows_terms:
+            term_ids = np.concatenate(rows_terms)
+        else:
+            term_ids = np.array([], dtype=np.int32)
+
+        docs_wdf = None
+        if normalized_weights:
+            docs_wdf = np.ceil([normalized_weights[docid]
+                                for docid in docids])
+            docs_wdf = np.repeat(docs_wdf,
+                                 [len(terms) for terms in rows_terms])
+
+        terms_wdf = np.bincount(term_ids, weights=docs_wdf,
+                                minlength=len(self.terms))
+
+        return np.unique(term_ids), terms_wdf
+
+    def get_terms_packages(self, docids, term_ids):
+        terms_packages = {}
+        selected = set(term_ids)
+
+        for docid in docids:
+            pkg = self.get_pkg(docid)
+            for term_id in self.get_row(docid):
+                if term_id in selected:
+                    terms_packages.setdefault(term_id, []).append(pkg)
+
+        return terms_packages
+
+    def get_time_weights(self, docids, term_ids):
+        terms_packages = self.get_terms_packages(docids, term_ids)
+        terms_packages = dict((self.terms[term_id], pkgs)
+                              for term_id, pkgs in terms_packages.iteritems())
+
+        return terms_time_weight([self.terms[term_id] for term_id in term_ids],
+                                 terms_packages)
+
+    def get_top_terms(self, term_ids, weights, limit=0):
+        """
+        Return (term, weight) tuples sorted by weight. If limit is set only
+        the best limit terms are selected and sorted.
+        """
+        if limit and limit < len(weights):
+            best = np.argpartition(-weights, limit - 1)[:limit]
+        else:
+            best = np.arange(len(weights))
+
+        best = best[np.argsort(-weights[best], kind='mergesort')]
+
+        return [(self.terms[term_ids[i]], weights[i]) for i in best]
+
+    def tfidf_weighting(self, docs, content_filter, normalized_weights=None,
+                        time_context=0, limit=0):
+        """
+        Vectorized version of data.tfidf_weighting, using the precomputed
+        idf of every term.
+        """
+        return self.tfidf_weighting_by_filter(
+            docs, FilterAny({None: content_filter}), normalized_weights,
+            time_context, limit)[None]
+
+    def tfidf_weighting_by_filter(self, docs, content_filter,
+                                  normalized_weights=None, time_context=0,
+                                  limit=0):
+        """
+        Vectorized version of data.tfidf_weighting_by_filter. The terms
+        accepted by any filter of content_filter, a FilterAny, are weighted
+        together and then split by filter.
+        """
+        docids = [d.docid for d in docs]
+        term_ids, terms_wdf = self.get_terms_wdf(docids, normalized_weights)
+
+        filters_masks = self.get_filters_masks(content_filter, term_ids)
+
+        selected = terms_wdf[term_ids] > 0
+        selected &= np.logical_or.reduce(filters_masks.values())
+
+        term_ids = term_ids[selected]
+        wdf = terms_wdf[term_ids]
+
+        weights = (1 + np.log(wdf)) * self.idf[term_ids]
+
+        if time_context:
+            weights *= self.get_time_weights(docids, term_ids)
+
+        filters_weights = {}
+        for name, mask in filters_masks.iteritems():
+            mask = mask[selected]
+            filters_weights[name] = self.get_top_terms(
+                term_ids[mask], weights[mask], limit)
+
+        return filters_weights
+
+    def get_filters_masks(self, content_filter, term_ids):
+        """
+        Return a dict with the mask of the term_ids accepted by every filter
+        of content_filter. Filters using the term classification of this
+        matrix are checked on its flags array.
+        """
+        filters_masks = {}
+        for name, term_filter in content_filter.content_filters.iteritems():
+            classification = getattr(term_filter, 'classification', None)
+
+            if (classification is not None and
+                    classification is self.classification):
+                filters_masks[name] = (self.flags[term_ids] &
+                                       term_filter.accepted_flags) != 0
+            else:
+                filters_masks[name] = np.array(
+                    [name in content_filter.get_filters(self.terms[term_id])
+                     for term_id in term_ids], dtype=bool)
+
+        return filters_masks
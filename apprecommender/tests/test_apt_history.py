@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from apprecommender.apt_history import AptHistoryIndex
+
+
+class AptHistoryIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.history_dir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.history_dir, 'history.log')
+        self.index_path = os.path.join(self.history_dir, 'index.pickle')
+
+    def tearDown(self):
+        shutil.rmtree(self.history_dir)
+
+    def get_index(self):
+        return AptHistoryIndex(self.index_path,
+                               os.path.join(self.history_dir, 'history.log*'))
+
+    def write_log(self, lines, log_path=None, mode='a'):
+        with open(log_path or self.log_path, mode) as log:
+            log.write(''.join(line + '\n' for line in lines))
+
+    def test_get_installed_pkgs(self):
+        self.write_log(['Start-Date: 2016-08-01  10:00:00',
+                        'Commandline: apt install vim gimp',
+                        'Commandline: apt-get install --no-remove eog',
+                        'Commandline: apt-get -o '
+                        'APT::Get::AutomaticRemove=true install inkscape',
+                        'Commandline: apt remove emacs'])
+
+        self.assertEqual(set(['vim', 'gimp']),
+                         self.get_index().get_installed_pkgs())
+
+    def test_gzip_log(self):
+        log = gzip.open(os.path.join(self.history_dir, 'history.log.1.gz'),
+                        'wb')
+        log.write('Commandline: apt install vim\n')
+        log.close()
+
+        self.write_log(['Commandline: apt install gimp'])
+
+        self.assertEqual(set(['vim', 'gimp']),
+                         self.get_index().get_installed_pkgs())
+
+    def test_only_new_lines_are_parsed(self):
+        self.write_log(['Commandline: apt install vim'])
+        self.get_index().get_installed_pkgs()
+
+        self.write_log(['Commandline: apt install gimp'])
+        index = self.get_index()
+
+        with patch.object(index, 'get_command_pkgs',
+                          wraps=index.get_command_pkgs) as mock_command_pkgs:
+            self.assertEqual(set(['vim', 'gimp']),
+                             index.get_installed_pkgs())
+
+        mock_command_pkgs.assert_called_once_with(
+            'Commandline: apt install gimp')
+
+    def test_rotated_log(self):
+        self.write_log(['Commandline: apt install vim'])
+        index = self.get_index()
+        index.get_installed_pkgs()
+
+        os.rename(self.log_path, self.log_path + '.1')
+        self.write_log(['Commandline: apt install gimp'])
+
+        self.assertEqual(set(['vim', 'gimp']), index.get_installed_pkgs())
+
+        os.remove(self.log_path + '.1')
+
+        self.assertEqual(set(['gimp']), index.get_installed_pkgs())
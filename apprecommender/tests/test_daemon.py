@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+import os
+import tempfile
+import threading
+import unittest
+
+from mock import MagicMock, patch
+
+from apprecommender.config import Config
+from apprecommender.main.daemon import (RecommenderClient,
+                                        RecommenderDaemonError,
+                                        RecommenderServer, STATUS_ERROR,
+                                        STATUS_INVALID_REQUEST)
+from apprecommender.recommender import RankedItem
+
+
+class RecommenderDaemonTests(unittest.TestCase):
+
+    def setUp(self):
+        self.socket_path = os.path.join(tempfile.mkdtemp(), 'apprec.sock')
+
+        rec = MagicMock()
+        rec.ranked_items.return_value = [RankedItem('vim', 3.0, 1),
+                                         RankedItem('gimp', 1.5, 2)]
+        rec.__str__.return_value = '\n1: vim\n2: gimp\n'
+        self.rec = rec
+
+        patcher = patch('apprecommender.main.daemon.AppRecommender')
+        app_recommender = patcher.start()
+        app_recommender.return_value.make_recommendation.return_value = rec
+        recommender = app_recommender.return_value.recommender
+        recommender.get_all_strategies.return_value = dict.fromkeys(
+            ['cbpkg', Config().strategy])
+        self.app_recommender = app_recommender.return_value
+        self.addCleanup(patcher.stop)
+
+        self.server = RecommenderServer(self.socket_path)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+
+    def test_get_recommendation(self):
+        client = RecommenderClient(self.socket_path)
+        response = client.get_recommendation(['vim'], strategy='cbpkg',
+                                             render=True)
+
+        self.assertEqual(['vim', 'gimp'], response['pkgs'])
+        self.assertEqual([['vim', 3.0, 1], ['gimp', 1.5, 2]],
+                         response['items'])
+        self.assertEqual('\n1: vim\n2: gimp\n', response['recommendation'])
+
+    def test_recommendation_not_rendered(self):
+        client = RecommenderClient(self.socket_path)
+        response = client.get_recommendation(['vim'], strategy='cbpkg',
+                                             because=True)
+
+        self.assertEqual(['vim', 'gimp'], response['pkgs'])
+        self.assertNotIn('recommendation', response)
+        self.assertFalse(self.rec.__str__.called)
+
+    def test_invalid_reference_pkgs(self):
+        client = RecommenderClient(self.socket_path)
+
+        with self.assertRaises(RecommenderDaemonError) as error:
+            client.get_recommendation(['vim; rm -rf /'])
+
+        self.assertEqual(STATUS_INVALID_REQUEST, error.exception.status)
+
+    def test_invalid_options(self):
+        client = RecommenderClient(self.socket_path)
+
+        for options in ({'profile_size': 'x'}, {'strategy': 'unknown'},
+                        {'num_recommendations': 2.5}, {'because': 'yes'}):
+            with self.assertRaises(RecommenderDaemonError) as error:
+                client.get_recommendation(['vim'], **options)
+
+            self.assertEqual(STATUS_INVALID_REQUEST, error.exception.status)
+
+    def test_unexpected_error(self):
+        self.app_recommender.make_recommendation.side_effect = KeyError('vim')
+        client = RecommenderClient(self.socket_path)
+
+        with self.assertRaises(RecommenderDaemonError) as error:
+            client.get_recommendation(['vim'])
+
+        self.assertEqual(STATUS_ERROR, error.exception.status)
+
+    def test_socket_removed_on_close(self):
+        self.assertTrue(RecommenderClient(self.socket_path).is_available())
+
+        self.server.shutdown()
+        self.server.server_close()
+
+        self.assertFalse(RecommenderClient(self.socket_path).is_available())
@@ -2,7 +2,12 @@
 
 import unittest
 
-from apprecommender.data_classification import linear_percent_function
+import numpy as np
+
+from mock import patch
+
+from apprecommender.data_classification import (linear_percent_function,
+                                                terms_time_weight)
 
 
 class DataClassificationTests(unittest.TestCase):
@@ -12,3 +17,19 @@ class DataClassificationTests(unittest.TestCase):
         percent = linear_percent_function(modify, access, time_now)
 
         self.assertEqual(0.75, percent)
+
+    def test_terms_time_weight(self):
+        pkgs_weight = {'vim': 9.0, 'gimp': 8.0, 'eog': 7.0, 'emacs': 6.0,
+                       'nano': 5.0, 'gedit': 4.0}
+        terms_packages = {'editor': ['gedit', 'vim', 'emacs', 'nano',
+                                     'gimp', 'eog'],
+                          'image': ['eog', 'gimp']}
+
+        with patch('apprecommender.data_classification.'
+                   'get_pkgs_time_weights') as mock_weights:
+            mock_weights.side_effect = lambda pkgs: np.array(
+                [pkgs_weight[pkg] for pkg in pkgs])
+            weights = terms_time_weight(['editor', 'image'], terms_packages)
+
+        self.assertAlmostEqual(35.0 / 5, weights[0])
+        self.assertAlmostEqual((8.0 + 7.0 + 6.8 + 6.6 + 6.4) / 5, weights[1])
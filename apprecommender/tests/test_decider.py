@@ -1,11 +1,29 @@
+import os
+import shutil
+import tempfile
 import unittest
 
+from mock import MagicMock, patch
+
+from apprecommender.config import Config
 from apprecommender.decider import PkgInitDecider
+from apprecommender.dependency_graph import DependencyGraph
 
 
 class PkgInitDeciderTests(unittest.TestCase):
 
     def setUp(self):
+        base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, base_dir)
+        graph_dir = os.path.join(base_dir, 'dependency_graph')
+        DependencyGraph.build([], MagicMock(), graph_dir)
+
+        for patcher in (patch.object(Config(), 'dependency_graph_dir',
+                                     graph_dir),
+                        patch.object(DependencyGraph, 'loaded', None)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
         self.pkg_init_decider = PkgInitDecider()
 
     def test_python_pkg_regex(self):
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+import collections
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import MagicMock, patch
+
+from apprecommender.dependency_graph import DependencyGraph
+
+Name = collections.namedtuple('Name', 'name')
+
+
+def create_pkg(name, tags=None, section='utils', dependencies=(),
+               recommends=()):
+    pkg = MagicMock()
+    pkg.name = name
+    pkg.candidate.record = {'Tag': tags} if tags else {}
+    pkg.candidate.section = section
+
+    def get_dependencies(*types):
+        deps = dependencies
+        if 'Recommends' in types:
+            deps += recommends
+
+        return [MagicMock(or_dependencies=[Name(alternative)
+                                           for alternative in dep])
+                for dep in deps]
+
+    pkg.candidate.get_dependencies.side_effect = get_dependencies
+    return pkg
+
+
+class DependencyGraphTests(unittest.TestCase):
+
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.graph_dir = os.path.join(self.base_dir, 'dependency_graph')
+
+        cache = [create_pkg('gimp', 'role::program', 'graphics',
+                            [('libc6',), ('python', 'python-minimal')],
+                            [('gimp-data',)]),
+                 create_pkg('python', 'role::program', 'interpreters',
+                            [('libc6',)]),
+                 create_pkg('gimp-doc', section='doc', dependencies=[
+                     ('gimp',)]),
+                 create_pkg('libc6', 'role::shared-lib', 'libs')]
+        axi = MagicMock()
+        axi.get_termfreq.side_effect = lambda term: int(
+            term != 'XPgimp-doc')
+
+        with patch.object(DependencyGraph, 'loaded', None):
+            DependencyGraph.build(cache, axi, self.graph_dir)
+            self.graph = DependencyGraph.get(self.graph_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.base_dir)
+
+    def test_get_dependencies(self):
+        self.assertEqual(set(['libc6', 'python']),
+                         self.graph.get_dependencies(['gimp']))
+        self.assertEqual(set(['libc6', 'python', 'python-minimal', 'gimp']),
+                         self.graph.get_or_dependencies(['gimp',
+                                                         'gimp-doc']))
+
+    def test_get_reverse_dependencies(self):
+        self.assertEqual(set(['gimp', 'python']),
+                         self.graph.get_reverse_dependencies(['libc6']))
+        self.assertEqual(set(['gimp']),
+                         self.graph.get_reverse_dependencies(['gimp-data']))
+        self.assertEqual(set(), self.graph.get_reverse_dependencies(['vim']))
+
+    def test_filter_by_flags(self):
+        self.assertEqual(set(['gimp', 'python']),
+                         self.graph.filter_by_flags(
+                             ['gimp', 'python', 'libc6', 'vim'],
+                             DependencyGraph.PROGRAM))
+        self.assertTrue(self.graph.has_flags('gimp-doc', DependencyGraph.DOC))
+        self.assertFalse(self.graph.has_flags('gimp-doc',
+                                              DependencyGraph.IN_AXI))
+        self.assertTrue(self.graph.has_flags(
+            'gimp', DependencyGraph.IN_CACHE | DependencyGraph.IN_AXI))
+        self.assertFalse(self.graph.has_flags('gimp-data',
+                                              DependencyGraph.IN_CACHE))
+
+    def test_rebuild_keeps_loaded_graph(self):
+        axi = MagicMock()
+        axi.get_termfreq.return_value = 1
+        DependencyGraph.build([create_pkg('vim', dependencies=[('libc6',)])],
+                              axi, self.graph_dir)
+
+        self.assertEqual(set(['libc6', 'python']),
+                         self.graph.get_dependencies(['gimp']))
+        self.assertEqual(set(['libc6']),
+                         DependencyGraph(self.graph_dir).get_dependencies(
+                             ['vim']))
+        self.assertEqual(1, len([path for path in os.listdir(self.base_dir)
+                                 if not os.path.islink(
+                                     os.path.join(self.base_dir, path))]))
+
+    def test_failed_build_keeps_graph(self):
+        axi = MagicMock()
+        axi.get_termfreq.side_effect = IOError('axi')
+
+        with self.assertRaises(IOError):
+            DependencyGraph.build([create_pkg('vim')], axi, self.graph_dir)
+
+        self.assertEqual(['dependency_graph', os.path.basename(
+            self.graph.data_dir)], sorted(os.listdir(self.base_dir)))
+        self.assertEqual(set(['libc6', 'python']),
+                         DependencyGraph(self.graph_dir).get_dependencies(
+                             ['gimp']))
+
+    @patch('apprecommender.dependency_graph.AptCache')
+    @patch('apprecommender.dependency_graph.PkgMetadata.get_lists_mtime')
+    def test_rebuild_on_lists_change(self, mock_lists_mtime, mock_apt_cache):
+        mock_lists_mtime.return_value = self.graph.lists_mtime
+
+        with patch.object(DependencyGraph, 'loaded', None), \
+                patch.object(DependencyGraph, 'build') as mock_build:
+            DependencyGraph.get(self.graph_dir)
+            self.assertFalse(mock_build.called)
+
+            mock_lists_mtime.return_value = -1.0
+            DependencyGraph.get(self.graph_dir)
+            self.assertTrue(mock_build.called)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from apprecommender.dpkg_status import DpkgStatus
+
+STATUS = """Package: vim
+Status: install ok installed
+Priority: optional
+Section: editors
+Description: Vi IMproved - enhanced vi editor
+ Vim is an almost compatible version of the UNIX editor Vi.
+
+Package: libc6
+Status: install ok installed
+Priority: required
+
+Package: apt
+Status: install ok installed
+Priority: important
+
+Package: emacs
+Status: deinstall ok config-files
+Priority: optional
+
+Package: nano
+Status: deinstall ok installed
+Priority: important
+
+Package: libgtk2.0-0
+Status: install ok installed
+Priority: optional
+Architecture: amd64
+
+Package: libgtk2.0-0
+Status: install ok installed
+Priority: optional
+Architecture: i386
+
+Package: libssl1.1
+Status: install ok installed
+Priority: optional
+Architecture: amd64
+
+Package: libssl1.1
+Status: install ok installed
+Priority: optional
+Architecture: i386
+
+Package: tzdata
+Status: install ok installed
+Priority: required
+Architecture: all
+"""
+
+EXTENDED_STATES = """Package: libc6
+Architecture: amd64
+Auto-Installed: 1
+
+Package: vim
+Architecture: amd64
+Auto-Installed: 0
+
+Package: libgtk2.0-0
+Architecture: amd64
+Auto-Installed: 1
+
+Package: libssl1.1
+Architecture: amd64
+Auto-Installed: 1
+
+Package: libssl1.1
+Architecture: i386
+Auto-Installed: 1
+
+Package: tzdata
+Architecture: amd64
+Auto-Installed: 1
+"""
+
+
+class DpkgStatusTests(unittest.TestCase):
+
+    def setUp(self):
+        self.status_dir = tempfile.mkdtemp()
+        status_path = os.path.join(self.status_dir, 'status')
+        extended_states_path = os.path.join(self.status_dir,
+                                            'extended_states')
+
+        with open(status_path, 'w') as status:
+            status.write(STATUS)
+        with open(extended_states_path, 'w') as extended_states:
+            extended_states.write(EXTENDED_STATES)
+
+        patchers = [patch.object(DpkgStatus, 'STATUS_PATH', status_path),
+                    patch.object(DpkgStatus, 'EXTENDED_STATES_PATH',
+                                 extended_states_path)]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.dpkg_status = DpkgStatus()
+        self.dpkg_status.mtimes = None
+
+    def tearDown(self):
+        shutil.rmtree(self.status_dir)
+
+    def test_get_installed_pkgs(self):
+        self.assertEqual(set(['vim', 'libc6', 'apt', 'libgtk2.0-0',
+                              'libssl1.1', 'tzdata']),
+                         self.dpkg_status.get_installed_pkgs())
+
+    def test_get_manual_pkgs(self):
+        self.assertEqual(set(['vim', 'apt', 'libgtk2.0-0']),
+                         self.dpkg_status.get_manual_pkgs())
+
+    def test_get_priority_pkgs(self):
+        self.assertEqual(set(['libc6', 'apt', 'tzdata']),
+                         self.dpkg_status.get_priority_pkgs())
+
+    def test_status_parsed_once(self):
+        self.dpkg_status.get_installed_pkgs()
+
+        with patch.object(DpkgStatus, 'parse_status') as mock_parse_status:
+            self.dpkg_status.get_installed_pkgs()
+
+        self.assertFalse(mock_parse_status.called)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from mock import patch
+
+from apprecommender.file_time import FileTimeService
+
+
+class FileTimeServiceTests(unittest.TestCase):
+
+    def setUp(self):
+        self.bin_dir = tempfile.mkdtemp()
+        self.vim_path = os.path.join(self.bin_dir, 'vim')
+
+        with open(self.vim_path, 'w') as vim:
+            vim.write('#!/bin/sh\n')
+        os.chmod(self.vim_path, stat.S_IRWXU)
+        os.utime(self.vim_path, (200, 100))
+
+        self.file_time = FileTimeService()
+        self.file_time.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.bin_dir)
+        self.file_time.max_files = FileTimeService.MAX_FILES
+        self.file_time.max_age = FileTimeService.MAX_AGE
+        self.file_time.clear()
+
+    def test_get_times(self):
+        self.assertEqual((100, 200), self.file_time.get_times(self.vim_path))
+        self.assertEqual((None, None),
+                         self.file_time.get_times(self.vim_path + '.txt'))
+
+    @patch.dict(os.environ, {'PATH': '/nonexistent'})
+    def test_get_binary_times(self):
+        self.assertEqual((None, None),
+                         self.file_time.get_times('vim', is_binary=True))
+
+        os.environ['PATH'] = self.bin_dir
+        self.file_time.clear()
+        self.assertEqual((100, 200),
+                         self.file_time.get_times('vim', is_binary=True))
+
+    def test_least_recently_used_evicted(self):
+        self.file_time.max_files = 1
+        self.file_time.get_times(self.vim_path)
+        self.file_time.get_times(self.bin_dir)
+
+        self.assertEqual([(self.bin_dir, False)], self.file_time.times.keys())
+
+    def test_expired_times_read_again(self):
+        self.file_time.get_times(self.vim_path)
+        os.utime(self.vim_path, (400, 300))
+        self.assertEqual((100, 200), self.file_time.get_times(self.vim_path))
+
+        self.file_time.max_age = 0
+        self.assertEqual((300, 400), self.file_time.get_times(self.vim_path))
+
+    def test_imap_unordered(self):
+        results = self.file_time.imap_unordered(lambda x: x * 2, range(10))
+
+        self.assertEqual(range(0, 20, 2), sorted(results))
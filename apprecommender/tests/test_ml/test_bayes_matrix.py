@@ -44,6 +44,20 @@ class PkgClassificationTests(unittest.TestCase):
         self.assertEqual(
             1, self.bayes_matrix.get_classification(attribute_vector))
 
+    def test_get_classifications(self):
+        data_matrix = np.matrix("1 0 1 0 1; 0 1 1 0 1; 1 0 0 1 1; 1 0 1 1 0;\
+                                 0 1 1 1 0")
+        classifications = np.matrix([[1], [2], [0], [1], [2]])
+
+        self.bayes_matrix.training(data_matrix, classifications, [0, 1, 2])
+
+        attribute_matrix = np.matrix("1 0 1 1 0; 0 1 1 0 1; 1 0 0 1 1;\
+                                      0 1 1 1 0; 1 0 1 0 1")
+
+        self.assertEqual(
+            [1, 2, 0, 2, 1],
+            self.bayes_matrix.get_classifications(attribute_matrix))
+
     def test_convert_classifications_to_numbers(self):
         classifications = np.matrix([['M'], ['B'], ['G']])
         order_of_classifications = ['B', 'M', 'G']
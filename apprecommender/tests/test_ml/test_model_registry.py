@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from apprecommender.ml.model_registry import ModelRegistry
+
+
+class ModelRegistryTests(unittest.TestCase):
+
+    def setUp(self):
+        self.model_dir = tempfile.mkdtemp()
+        self.model_path = os.path.join(self.model_dir, 'model.pickle')
+        self.save_model(['vim', 'editor'])
+
+        self.model_registry = ModelRegistry()
+        self.model_registry.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.model_dir)
+
+    def save_model(self, model, mtime=None):
+        with open(self.model_path, 'wb') as model_file:
+            pickle.dump(model, model_file)
+
+        if mtime is not None:
+            os.utime(self.model_path, (mtime, mtime))
+
+    def test_model_loaded_once(self):
+        model = self.model_registry.get(self.model_path)
+
+        self.assertEqual(['vim', 'editor'], model)
+        self.assertIs(model, self.model_registry.get(self.model_path))
+
+    def test_model_reloaded_when_changed(self):
+        self.model_registry.get(self.model_path)
+        self.save_model(['gimp', 'image'], mtime=0)
+
+        self.assertEqual(['gimp', 'image'],
+                         self.model_registry.get(self.model_path))
+
+    def test_model_kept_when_content_is_the_same(self):
+        model = self.model_registry.get(self.model_path)
+        self.save_model(['vim', 'editor'], mtime=0)
+
+        self.assertIs(model, self.model_registry.get(self.model_path))
+
+    def test_missing_model(self):
+        with self.assertRaises(IOError):
+            self.model_registry.get(os.path.join(self.model_dir, 'missing'))
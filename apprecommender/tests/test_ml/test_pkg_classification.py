@@ -30,6 +30,17 @@ class PkgClassificationTests(unittest.TestCase):
         for debtag in vim_debtags:
             self.assertTrue(debtag in vim_debtags_result)
 
+    def test_get_pkgs_debtags(self):
+        axi_path = "/var/lib/apt-xapian-index/index"
+        axi = xapian.Database(axi_path)
+        pkgs = ['vim', 'gimp', 'not-a-package']
+
+        pkgs_debtags = self.ml_data.get_pkgs_debtags(axi, pkgs)
+
+        for pkg in pkgs:
+            self.assertEqual(sorted(self.ml_data.get_pkg_debtags(axi, pkg)),
+                             sorted(pkgs_debtags[pkg]))
+
     @patch('apprecommender.ml.data.MachineLearningData.get_pkg_description')
     def test_get_pkg_terms(self, mock_description):
         mock_description.return_value = 'Vim is an text editor written in C'
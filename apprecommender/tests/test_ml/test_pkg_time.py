@@ -1,9 +1,13 @@
 #!/usr/bin/env python
 
+import os
+import shutil
+import tempfile
 import unittest
 from mock import patch
 
-from apprecommender.ml.pkg_time import PkgTime
+from apprecommender.file_time import FileTimeService
+from apprecommender.ml.pkg_time import PkgTime, PkgTimeStore
 
 
 class PkgTimeTests(unittest.TestCase):
@@ -11,103 +15,163 @@ class PkgTimeTests(unittest.TestCase):
     def setUp(self):
         self.pkg_time = PkgTime()
 
-    @patch('commands.getoutput')
-    @patch('apprecommender.ml.pkg_time.get_time_from_package')
-    def test_invalid_paths_get_best_time(self, mock_time, mock_command):
+    def get_best_time(self, pkg):
+        return self.pkg_time.get_files_best_time(
+            self.pkg_time.get_pkg_files(pkg))
+
+    @patch('apprecommender.ml.pkg_time.PkgFilesIndex.get_files')
+    @patch('apprecommender.ml.pkg_time.FileTimeService.read_times')
+    def test_invalid_paths_get_best_time(self, mock_time, mock_files):
         mock_time.return_value = [10, 10]
 
-        mock_command.return_value = '/usr/lib/a-b-c/\n'
-        access, modify = self.pkg_time.get_best_time('test')
+        mock_files.return_value = ['/usr/lib/a-b-c/']
+        access, modify = self.get_best_time('test')
 
         self.assertEqual(access, 0)
         self.assertEqual(modify, 0)
 
-        mock_command.return_value = '/usr/lib/a-b-c-d/\n'
-        access, modify = self.pkg_time.get_best_time('test')
+        mock_files.return_value = ['/usr/lib/a-b-c-d/']
+        access, modify = self.get_best_time('test')
 
         self.assertEqual(access, 0)
         self.assertEqual(modify, 0)
 
-        mock_command.return_value = '/usr/lib/mime/packages/test\n'
-        access, modify = self.pkg_time.get_best_time('test')
+        mock_files.return_value = ['/usr/lib/mime/packages/test']
+        access, modify = self.get_best_time('test')
 
         self.assertEqual(access, 0)
         self.assertEqual(modify, 0)
 
-        mock_command.return_value = '/etc/init.d/test\n'
-        access, modify = self.pkg_time.get_best_time('test')
+        mock_files.return_value = ['/etc/init.d/test']
+        access, modify = self.get_best_time('test')
 
         self.assertEqual(access, 0)
         self.assertEqual(modify, 0)
 
-        mock_command.return_value = '/media/files/test\n'
-        access, modify = self.pkg_time.get_best_time('test')
+        mock_files.return_value = ['/media/files/test']
+        access, modify = self.get_best_time('test')
 
         self.assertEqual(access, 0)
         self.assertEqual(modify, 0)
 
-    @patch('commands.getoutput')
-    @patch('apprecommender.ml.pkg_time.get_time_from_package')
-    def test_valid_paths_get_best_time(self, mock_time, mock_command):
+    @patch('apprecommender.ml.pkg_time.PkgFilesIndex.get_files')
+    @patch('apprecommender.ml.pkg_time.FileTimeService.read_times')
+    def test_valid_paths_get_best_time(self, mock_time, mock_files):
         mock_time.return_value = [10, 10]
-        mock_command.return_value = '/usr/lib/a-b/\n'
-        access, modify = self.pkg_time.get_best_time('test')
+        mock_files.return_value = ['/usr/lib/a-b/']
+        access, modify = self.get_best_time('test')
 
         self.assertEqual(access, 10)
         self.assertEqual(modify, 10)
 
         mock_time.return_value = [20, 20]
-        mock_command.return_value = '/usr/bin/test\n'
-        access, modify = self.pkg_time.get_best_time('test')
+        mock_files.return_value = ['/usr/bin/test']
+        access, modify = self.get_best_time('test')
 
         self.assertEqual(access, 20)
         self.assertEqual(modify, 20)
 
         mock_time.return_value = [30, 30]
-        mock_command.return_value = '/usr/game/test\n'
-        access, modify = self.pkg_time.get_best_time('test')
+        mock_files.return_value = ['/usr/game/test']
+        access, modify = self.get_best_time('test')
 
         self.assertEqual(access, 30)
         self.assertEqual(modify, 30)
 
         mock_time.return_value = [40, 40]
-        mock_command.return_value = '/usr/lib/test/test\n'
-        access, modify = self.pkg_time.get_best_time('test')
+        mock_files.return_value = ['/usr/lib/test/test']
+        access, modify = self.get_best_time('test')
 
         self.assertEqual(access, 40)
         self.assertEqual(modify, 40)
 
-    @patch('commands.getoutput')
-    @patch('apprecommender.ml.pkg_time.get_time_from_package')
-    def test_invalid_files_get_best_time(self, mock_time, mock_command):
+    @patch('apprecommender.ml.pkg_time.PkgFilesIndex.get_files')
+    @patch('apprecommender.ml.pkg_time.FileTimeService.read_times')
+    def test_invalid_files_get_best_time(self, mock_time, mock_files):
         mock_time.return_value = [10, 10]
-        mock_command.return_value = '/usr/bin/test.desktop\n'
+        mock_files.return_value = ['/usr/bin/test.desktop']
 
-        access, modify = self.pkg_time.get_best_time('test')
+        access, modify = self.get_best_time('test')
 
         self.assertEqual(access, 0)
         self.assertEqual(modify, 0)
 
         mock_time.return_value = [10, 10]
-        mock_command.return_value = '/usr/games/test.conf\n'
+        mock_files.return_value = ['/usr/games/test.conf']
 
-        access, modify = self.pkg_time.get_best_time('test')
+        access, modify = self.get_best_time('test')
 
         self.assertEqual(access, 0)
         self.assertEqual(modify, 0)
 
         mock_time.return_value = [10, 10]
-        mock_command.return_value = '/usr/lib/python/test.egg-info\n'
+        mock_files.return_value = ['/usr/lib/python/test.egg-info']
 
-        access, modify = self.pkg_time.get_best_time('test')
+        access, modify = self.get_best_time('test')
 
         self.assertEqual(access, 0)
         self.assertEqual(modify, 0)
 
         mock_time.return_value = [10, 10]
-        mock_command.return_value = '/usr/lib/test/test.txt\n'
+        mock_files.return_value = ['/usr/lib/test/test.txt']
 
-        access, modify = self.pkg_time.get_best_time('test')
+        access, modify = self.get_best_time('test')
 
         self.assertEqual(access, 0)
         self.assertEqual(modify, 0)
+
+    @patch('apprecommender.ml.pkg_time.PkgFilesIndex.get_list_mtime')
+    @patch('apprecommender.ml.pkg_time.PkgFilesIndex.get_files')
+    @patch('apprecommender.ml.pkg_time.FileTimeService.read_times')
+    def test_update_packages_time(self, mock_time, mock_files, mock_mtime):
+        store_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, store_dir)
+        db_path = os.path.join(store_dir, 'pkg_time.db')
+
+        mock_time.return_value = (10, 20)
+        mock_files.side_effect = lambda pkg: ['/usr/bin/' + pkg]
+        mock_mtime.return_value = 1.0
+
+        pkgs_time = self.pkg_time.update_packages_time(['vim', 'gimp'],
+                                                       db_path)
+        self.assertEqual({'vim': [10, 20], 'gimp': [10, 20]}, pkgs_time)
+
+        mock_files.reset_mock()
+        mock_time.return_value = (10, 30)
+        mock_mtime.side_effect = lambda pkg: 2.0 if pkg == 'eog' else 1.0
+
+        pkgs_time = self.pkg_time.update_packages_time(['vim', 'eog'],
+                                                       db_path)
+        self.assertEqual({'vim': [10, 30], 'eog': [10, 30]}, pkgs_time)
+        mock_files.assert_called_once_with('eog')
+
+        store = PkgTimeStore(db_path)
+        self.assertEqual(set(['vim', 'eog']), set(store.get_pkgs()))
+        store.close()
+
+    @patch('apprecommender.ml.pkg_time.PkgFilesIndex.get_list_mtime')
+    @patch('apprecommender.ml.pkg_time.PkgFilesIndex.get_files')
+    def test_update_reads_new_access_times(self, mock_files, mock_mtime):
+        store_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, store_dir)
+        db_path = os.path.join(store_dir, 'pkg_time.db')
+
+        lib_dir = os.path.join(store_dir, 'usr', 'lib', 'vim')
+        os.makedirs(lib_dir)
+        vim_path = os.path.join(lib_dir, 'vimrun')
+        open(vim_path, 'w').close()
+        os.utime(vim_path, (200, 100))
+
+        mock_files.return_value = [vim_path]
+        mock_mtime.return_value = 1.0
+
+        self.assertEqual({'vim': [100, 200]},
+                         self.pkg_time.update_packages_time(['vim'], db_path))
+
+        FileTimeService().clear()
+        self.addCleanup(FileTimeService().clear)
+        FileTimeService().get_times(vim_path)
+        os.utime(vim_path, (300, 100))
+
+        self.assertEqual({'vim': [100, 300]},
+                         self.pkg_time.update_packages_time(['vim'], db_path))
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from apprecommender.pkg_files import PkgFilesIndex
+
+
+class PkgFilesIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.info_dir = tempfile.mkdtemp()
+
+        patcher = patch.object(PkgFilesIndex, 'INFO_DIR', self.info_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.write_list('vim', ['/.', '/usr', '/usr/bin', '/usr/bin/vim',
+                                '/usr/share/doc/vim/copyright'])
+        self.write_list('iptables:amd64', ['/usr/sbin/iptables',
+                                           '/usr/lib/x86_64-linux-gnu/xt'])
+
+        self.pkg_files = PkgFilesIndex()
+        self.pkg_files.index_path = os.path.join(self.info_dir, 'index')
+        self.pkg_files.lists = None
+        self.pkg_files.info_mtime = None
+
+    def tearDown(self):
+        shutil.rmtree(self.info_dir)
+
+    def write_list(self, pkg, files):
+        list_path = os.path.join(self.info_dir, pkg + '.list')
+        with open(list_path, 'w') as pkg_list:
+            pkg_list.write(''.join(path + '\n' for path in files))
+
+    def test_get_files(self):
+        self.assertEqual(['/usr/bin/vim'], self.pkg_files.get_files('vim'))
+        self.assertEqual([], self.pkg_files.get_files('emacs'))
+
+    def test_get_binaries(self):
+        self.assertEqual(['/usr/bin/vim'],
+                         self.pkg_files.get_binaries('vim'))
+        self.assertEqual(['/usr/sbin/iptables'],
+                         self.pkg_files.get_binaries('iptables'))
+
+    def test_only_modified_lists_are_read(self):
+        self.pkg_files.get_files('vim')
+
+        self.write_list('gimp', ['/usr/bin/gimp'])
+        self.pkg_files.info_mtime = None
+
+        with patch.object(self.pkg_files, 'read_list',
+                          wraps=self.pkg_files.read_list) as mock_read_list:
+            self.assertEqual(['/usr/bin/gimp'],
+                             self.pkg_files.get_files('gimp'))
+
+        mock_read_list.assert_called_once_with(
+            os.path.join(self.info_dir, 'gimp.list'))
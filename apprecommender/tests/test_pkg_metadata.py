@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import MagicMock, patch
+
+from apprecommender.pkg_metadata import PkgMetadata
+
+
+def create_pkg(name, summary=None, section=None, tags=None,
+               dependencies=None):
+    pkg = MagicMock()
+    pkg.name = name
+
+    if summary is None:
+        pkg.candidate = None
+        return pkg
+
+    deps = []
+    for alternatives in dependencies or []:
+        dep = []
+        for alternative in alternatives:
+            or_dep = MagicMock()
+            or_dep.name = alternative
+            dep.append(or_dep)
+        dep_mock = MagicMock()
+        dep_mock.__getitem__.side_effect = dep.__getitem__
+        dep_mock.or_dependencies = dep
+        deps.append(dep_mock)
+
+    pkg.candidate.summary = summary
+    pkg.candidate.description = summary + ' description'
+    pkg.candidate.section = section
+    pkg.candidate.record = {'Tag': tags} if tags else {}
+    pkg.candidate.dependencies = deps
+
+    return pkg
+
+
+class PkgMetadataTests(unittest.TestCase):
+
+    def setUp(self):
+        self.metadata_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.metadata_dir, 'pkg_metadata.db')
+
+        cache = [create_pkg('vim', 'Vi IMproved', 'editors',
+                            'role::program, devel::editor',
+                            [['libc6'], ['vim-common', 'vim-tiny']]),
+                 create_pkg('libc6', 'GNU C Library', 'libs'),
+                 create_pkg('oldpkg'),
+                 create_pkg('notindexed', 'Not indexed', 'misc')]
+
+        axi = MagicMock()
+        axi.get_termfreq.side_effect = (
+            lambda term: 0 if term == 'XPnotindexed' else 1)
+
+        PkgMetadata.build(cache, axi, self.db_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.metadata_dir)
+
+    def test_get_pkg_info(self):
+        pkg_info = PkgMetadata.get(self.db_path).get_pkg_info('vim')
+
+        self.assertTrue(pkg_info['in_cache'])
+        self.assertTrue(pkg_info['has_candidate'])
+        self.assertEqual('Vi IMproved', pkg_info['summary'])
+        self.assertEqual('editors', pkg_info['section'])
+        self.assertEqual('role::program, devel::editor', pkg_info['tags'])
+        self.assertEqual(['libc6', 'vim-common'], pkg_info['dependencies'])
+        self.assertEqual(['libc6', 'vim-common', 'vim-tiny'],
+                         pkg_info['or_dependencies'])
+
+    def test_pkg_without_candidate(self):
+        pkg_info = PkgMetadata.get(self.db_path).get_pkg_info('oldpkg')
+
+        self.assertTrue(pkg_info['in_cache'])
+        self.assertFalse(pkg_info['has_candidate'])
+        self.assertIsNone(pkg_info['summary'])
+
+    def test_pkg_not_indexed(self):
+        pkg_info = PkgMetadata.get(self.db_path).get_pkg_info('notindexed')
+
+        self.assertFalse(pkg_info['in_cache'])
+        self.assertIsNone(pkg_info['tags'])
+
+    @patch('apprecommender.pkg_metadata.PkgMetadata.get_lists_mtime')
+    def test_outdated_metadata(self, mock_lists_mtime):
+        mock_lists_mtime.return_value = -1.0
+
+        self.assertIsNone(PkgMetadata.get(self.db_path))
+
+    def test_rebuild_keeps_open_metadata(self):
+        metadata = PkgMetadata.get(self.db_path)
+        axi = MagicMock()
+        axi.get_termfreq.return_value = 1
+
+        PkgMetadata.build([create_pkg('emacs', 'GNU Emacs', 'editors')], axi,
+                          self.db_path)
+
+        self.assertTrue(metadata.get_pkg_info('vim')['in_cache'])
+        self.assertTrue(
+            PkgMetadata.get(self.db_path).get_pkg_info('emacs')['in_cache'])
+        self.assertEqual(['pkg_metadata.db'], os.listdir(self.metadata_dir))
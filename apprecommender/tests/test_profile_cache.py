@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import MagicMock, patch
+
+from apprecommender.profile_cache import ProfileCache
+
+
+class ProfileCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.cache_dir, 'profiles.pickle')
+
+        self.index = MagicMock()
+        self.index.get_uuid.return_value = 'test-uuid'
+        self.index.get_doccount.return_value = 10
+        self.index.get_lastdocid.return_value = 10
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def get_key(self, pkg_profile, content='mix', size=10):
+        return ProfileCache.get_key(self.index, pkg_profile, content, size,
+                                    ['devel::editor'])
+
+    def test_profile_persisted(self):
+        key = self.get_key(['vim', 'gimp'])
+        ProfileCache(self.cache_path, 2).set(key, ['editor', 'image'])
+
+        self.assertEqual(['editor', 'image'],
+                         ProfileCache(self.cache_path, 2).get(key))
+
+    def test_key_changes_with_inputs(self):
+        key = self.get_key(['vim', 'gimp'])
+
+        self.assertEqual(key, self.get_key(['gimp', 'vim']))
+        self.assertNotEqual(key, self.get_key(['vim']))
+        self.assertNotEqual(key, self.get_key(['vim', 'gimp'], content='tag'))
+        self.assertNotEqual(key, self.get_key(['vim', 'gimp'], size=20))
+
+        self.index.get_uuid.return_value = 'other-uuid'
+        self.assertNotEqual(key, self.get_key(['vim', 'gimp']))
+
+    def test_least_recently_used_evicted(self):
+        profile_cache = ProfileCache(self.cache_path, 2)
+        profile_cache.set('vim', ['editor'])
+        profile_cache.set('gimp', ['image'])
+        profile_cache.get('vim')
+        profile_cache.set('eog', ['viewer'])
+
+        profile_cache = ProfileCache(self.cache_path, 2)
+        self.assertEqual(['editor'], profile_cache.get('vim'))
+        self.assertIsNone(profile_cache.get('gimp'))
+        self.assertEqual(['viewer'], profile_cache.get('eog'))
+
+    def test_get_does_not_save(self):
+        profile_cache = ProfileCache(self.cache_path, 2)
+        profile_cache.set('vim', ['editor'])
+        profile_cache.set('gimp', ['image'])
+
+        with patch.object(ProfileCache, 'save') as mock_save:
+            self.assertEqual(['editor'], profile_cache.get('vim'))
+
+        self.assertFalse(mock_save.called)
+        self.assertEqual(['profiles.pickle'], os.listdir(self.cache_dir))
+
+    def test_disabled_cache(self):
+        profile_cache = ProfileCache(self.cache_path, 0)
+        profile_cache.set('vim', ['editor'])
+
+        self.assertIsNone(profile_cache.get('vim'))
+        self.assertFalse(os.path.exists(self.cache_path))
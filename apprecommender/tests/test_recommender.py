@@ -45,6 +45,11 @@ class RecommendationResultTests(unittest.TestCase):
         prediction = [("inkscape", 3.0), ("gimp", 1.5), ("eog", 1)]
         self.assertEqual(self.result.get_prediction(), prediction)
 
+    def test_ranked_items(self):
+        ranked_items = [("inkscape", 3.0, 1), ("gimp", 1.5, 2)]
+        self.assertEqual(list(self.result.ranked_items(2)), ranked_items)
+        self.assertEqual("gimp", list(self.result.ranked_items())[1].package)
+
 
 class RecommenderTests(unittest.TestCase):
 
@@ -22,8 +22,13 @@ __license__ = """
 import unittest
 import xapian
 
-from apprecommender.decider import (PkgMatchDecider, PkgExpandDecider,
+from mock import MagicMock, patch
+
+from apprecommender.decider import (PkgMatchDecider, PkgMatchFilter,
+                                    PkgExpandDecider,
+                                    PkgReverseDependeciesDecider,
                                     TagExpandDecider)
+from apprecommender.dependency_graph import DependencyGraph
 
 
 class PkgMatchDeciderTests(unittest.TestCase):
@@ -42,6 +47,76 @@ class PkgMatchDeciderTests(unittest.TestCase):
         self.assertFalse(self.decider(self.doc))
 
 
+class PkgMatchFilterTests(unittest.TestCase):
+
+    def is_accepted(self, match_filter, pkg):
+        doc_terms = set(PkgMatchFilter.get_document_terms(pkg))
+        doc_terms.add("XP" + pkg)
+
+        return not doc_terms & set(match_filter.get_excluded_terms())
+
+    def test_same_result_as_match_decider(self):
+        pkgs = ["emacs", "gimp", "libgtk2.0-0", "vim-doc", "kdevelop",
+                "gnome-terminal", "libkdecore5", "python:any", "inkscape"]
+
+        for pkgs_list in (["gimp", "eog"], ["gimp", "kde", "gnome"]):
+            decider = PkgMatchDecider(pkgs_list)
+            match_filter = PkgMatchFilter(pkgs_list)
+
+            for pkg in pkgs:
+                doc = xapian.Document()
+                doc.set_data(pkg)
+                self.assertEqual(bool(decider(doc)),
+                                 self.is_accepted(match_filter, pkg))
+
+
+class PkgReverseDependeciesDeciderTests(unittest.TestCase):
+
+    @patch('apprecommender.decider.PkgInitDecider')
+    def setUp(self, mock_init_decider):
+        in_axi = DependencyGraph.IN_CACHE | DependencyGraph.IN_AXI
+        flags = {'gimp-plugin': in_axi,
+                 'gimp-doc': in_axi | DependencyGraph.DOC,
+                 'gimp-lua': in_axi,
+                 'gimp-python': DependencyGraph.IN_CACHE,
+                 'gimp': in_axi}
+
+        graph = MagicMock()
+        graph.filter_by_flags.side_effect = lambda pkgs, pkg_flags: set(
+            pkg for pkg in pkgs if flags.get(pkg, 0) & pkg_flags == pkg_flags)
+        graph.has_flags.side_effect = lambda pkg, pkg_flags: (
+            flags[pkg] & pkg_flags == pkg_flags)
+
+        init_decider = mock_init_decider.return_value
+        init_decider.graph = graph
+        init_decider.is_program_dependencies_installed.side_effect = (
+            lambda pkg: pkg != 'gimp-lua')
+
+        self.decider = PkgReverseDependeciesDecider(
+            ['gimp-plugin', 'gimp-doc', 'gimp-lua', 'gimp-python', 'gimp',
+             'gimp-data'],
+            ['gimp'])
+
+    def test_get_valid_pkgs(self):
+        self.assertEqual(set(['gimp-plugin']), self.decider.get_valid_pkgs())
+
+    def test_call(self):
+        doc = xapian.Document()
+        doc.set_data('gimp-plugin')
+        self.assertTrue(self.decider(doc))
+
+        doc.set_data('gimp-doc')
+        self.assertFalse(self.decider(doc))
+
+    @patch('apprecommender.decider.xapian.Query')
+    def test_filter_query(self, mock_query):
+        self.decider.filter_query('query')
+
+        mock_query.assert_any_call(xapian.Query.OP_OR, ['XPgimp-plugin'])
+        mock_query.assert_called_with(xapian.Query.OP_FILTER, 'query',
+                                      mock_query.return_value)
+
+
 class PkgExpandDeciderTests(unittest.TestCase):
 
     def setUp(self):
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+
+import collections
+import math
+import shutil
+import tempfile
+import unittest
+
+from mock import MagicMock, patch
+
+from apprecommender.decider import (FilterAny, FilterDescription, FilterTag,
+                                    FilterTag_or_Description,
+                                    TermClassification)
+from apprecommender.term_matrix import PkgTermMatrix
+
+Term = collections.namedtuple('Term', 'term')
+Doc = collections.namedtuple('Doc', 'docid')
+
+
+def create_index(docs):
+    index = MagicMock()
+    index.get_uuid.return_value = 'test-uuid'
+    index.get_doccount.return_value = len(docs)
+    index.get_lastdocid.return_value = len(docs)
+
+    def get_document(docid):
+        pkg, terms = docs[docid - 1]
+        doc = MagicMock()
+        doc.get_data.return_value = pkg
+        doc.termlist.return_value = [Term(term) for term in terms]
+        return doc
+
+    index.get_document.side_effect = get_document
+    return index
+
+
+class PkgTermMatrixTests(unittest.TestCase):
+
+    def setUp(self):
+        self.matrix_dir = tempfile.mkdtemp()
+        self.index = create_index([
+            ('vim', ['XPvim', 'XTdevel::editor', 'editor', 'text']),
+            ('gimp', ['XPgimp', 'XTuse::editing', 'editor', 'image']),
+            ('eog', ['XPeog', 'XTuse::viewing', 'image', 'viewer'])])
+        PkgTermMatrix.build(self.index, self.matrix_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.matrix_dir)
+
+    def test_get_doc_terms(self):
+        matrix = PkgTermMatrix.get(self.index, self.matrix_dir)
+
+        self.assertEqual('gimp', matrix.get_pkg(2))
+        self.assertEqual(['XPgimp', 'XTuse::editing', 'editor', 'image'],
+                         matrix.get_doc_terms(2))
+
+    def test_shared_terms_have_same_id(self):
+        matrix = PkgTermMatrix.get(self.index, self.matrix_dir)
+
+        self.assertEqual(matrix.get_row(1)[2], matrix.get_row(2)[2])
+
+    def test_get_matrix_of_other_index(self):
+        other_index = create_index([('vim', ['XPvim'])])
+
+        self.assertIsNone(PkgTermMatrix.get(other_index, self.matrix_dir))
+
+    def test_tfidf_weighting(self):
+        matrix = PkgTermMatrix.get(self.index, self.matrix_dir)
+        docs = [Doc(1), Doc(2)]
+
+        weights = matrix.tfidf_weighting(docs, lambda term: term.islower())
+
+        editor_weight = (1 + math.log(2)) * math.log(3 / 2.0)
+        text_weight = math.log(3)
+        image_weight = math.log(3 / 2.0)
+
+        self.assertEqual(['text', 'editor', 'image'],
+                         [term for term, _ in weights])
+        self.assertAlmostEqual(text_weight, weights[0][1])
+        self.assertAlmostEqual(editor_weight, weights[1][1])
+        self.assertAlmostEqual(image_weight, weights[2][1])
+
+    def test_tfidf_weighting_limit(self):
+        matrix = PkgTermMatrix.get(self.index, self.matrix_dir)
+        docs = [Doc(1), Doc(2), Doc(3)]
+
+        all_weights = matrix.tfidf_weighting(docs, lambda term: True)
+        weights = matrix.tfidf_weighting(docs, lambda term: True, limit=3)
+
+        self.assertEqual(3, len(weights))
+        self.assertEqual([weight for _, weight in all_weights[:3]],
+                         [weight for _, weight in weights])
+
+    def test_tfidf_weighting_by_filter(self):
+        matrix = PkgTermMatrix.get(self.index, self.matrix_dir)
+        docs = [Doc(1), Doc(2), Doc(3)]
+        content_filters = {'tag': lambda term: term.startswith('XT'),
+                           'desc': lambda term: term.islower()}
+
+        filters_weights = matrix.tfidf_weighting_by_filter(
+            docs, FilterAny(content_filters), limit=2)
+
+        for name, content_filter in content_filters.iteritems():
+            self.assertEqual(matrix.tfidf_weighting(docs, content_filter,
+                                                    limit=2),
+                             filters_weights[name])
+
+    def test_term_classification(self):
+        PkgTermMatrix.build(self.index, self.matrix_dir, ['devel::editor'])
+        matrix = PkgTermMatrix.get(self.index, self.matrix_dir)
+
+        self.assertIsNone(matrix.get_term_classification(['use::viewing']))
+
+        classification = matrix.get_term_classification(['devel::editor'])
+        self.assertEqual(TermClassification.TAG,
+                         classification.get_flags('XTdevel::editor'))
+        self.assertEqual(0, classification.get_flags('XTuse::editing'))
+        self.assertEqual(TermClassification.DESCRIPTION,
+                         classification.get_flags('editor'))
+
+    def test_tfidf_weighting_with_classification(self):
+        PkgTermMatrix.build(self.index, self.matrix_dir, ['use::editing'])
+        matrix = PkgTermMatrix.get(self.index, self.matrix_dir)
+        classification = matrix.get_term_classification(['use::editing'])
+        docs = [Doc(1), Doc(2), Doc(3)]
+
+        for content_filter in (FilterTag(['use::editing']),
+                               FilterDescription(),
+                               FilterTag_or_Description(['use::editing'])):
+            weights = matrix.tfidf_weighting(docs, content_filter)
+            content_filter.classification = classification
+
+            self.assertEqual(weights,
+                             matrix.tfidf_weighting(docs, content_filter))
+
+    @patch('apprecommender.decider.xapian.ExpandDeciderFilterTerms')
+    def test_native_expand_decider(self, mock_filter_terms):
+        PkgTermMatrix.build(self.index, self.matrix_dir, [])
+        matrix = PkgTermMatrix.get(self.index, self.matrix_dir)
+        classification = matrix.get_term_classification([])
+
+        content_filter = FilterAny({'tag': FilterTag([])})
+        self.assertIs(content_filter, content_filter.get_expand_decider())
+
+        content_filter = FilterAny({'tag': FilterTag([], classification),
+                                    'desc': FilterDescription(classification)})
+        self.assertIs(mock_filter_terms.return_value,
+                      content_filter.get_expand_decider())
+
+        terms = mock_filter_terms.call_args[0][0]
+        self.assertEqual(['XTdevel::editor', 'XTuse::editing',
+                          'XTuse::viewing', 'editor', 'image', 'text',
+                          'viewer'], sorted(terms))
+
+        content_filter.get_expand_decider()
+        self.assertEqual(1, mock_filter_terms.call_count)
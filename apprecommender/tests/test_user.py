@@ -19,14 +19,22 @@ __license__ = """
     along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import os
+import random
+import shutil
+import tempfile
 import unittest
 import xapian
 
-from mock import patch
+from collections import namedtuple
+from mock import MagicMock, patch
 
 from apprecommender.user import User, LocalSystem, FilterTag, FilterDescription
 from apprecommender.config import Config
 from apprecommender.data import SampleAptXapianIndex
+from apprecommender.dependency_graph import DependencyGraph
+
+Name = namedtuple('Name', 'name')
 
 
 class FilterTagTests(unittest.TestCase):
@@ -65,6 +73,26 @@ class UserTests(unittest.TestCase):
         self.sample_axi = SampleAptXapianIndex(packages, self.axi, path)
         self.user = User({"gimp": 1, "aaphoto": 1, "eog": 1, "emacs": 1})
 
+    def build_dependency_graph(self, dependencies):
+        base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, base_dir)
+        graph_dir = os.path.join(base_dir, 'dependency_graph')
+
+        cache = []
+        for name, pkg_deps in dependencies.iteritems():
+            pkg = MagicMock()
+            pkg.name = name
+            pkg.candidate.get_dependencies.return_value = [
+                MagicMock(or_dependencies=[Name(dep)]) for dep in pkg_deps]
+            cache.append(pkg)
+        DependencyGraph.build(cache, MagicMock(), graph_dir)
+
+        for patcher in (patch.object(Config(), 'dependency_graph_dir',
+                                     graph_dir),
+                        patch.object(DependencyGraph, 'loaded', None)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
     def test_hash(self):
         new_user = User(dict())
         self.assertIsNotNone(new_user.id)
@@ -76,6 +104,18 @@ class UserTests(unittest.TestCase):
                        "interface::x11"])
         self.assertEqual(new_user.demographic_profile, desktop)
 
+    @patch('apprecommender.data.get_user_installed_pkgs')
+    def test_installed_pkgs_loaded_lazily(self, mock_installed_pkgs):
+        mock_installed_pkgs.return_value = set(['vim'])
+        new_user = User({'gimp': 1})
+
+        self.assertFalse(mock_installed_pkgs.called)
+        self.assertEqual(set(['vim']), new_user.installed_pkgs)
+        self.assertEqual(set(['gimp']),
+                         User({'gimp': 1},
+                              installed_pkgs=set(['gimp'])).installed_pkgs)
+        self.assertEqual(1, mock_installed_pkgs.call_count)
+
     def test_profile_desktop(self):
         self.user.set_demographic_profile(set(["desktop"]))
         desktop = set(["x11", "accessibility", "game", "junior", "office",
@@ -133,6 +173,8 @@ class UserTests(unittest.TestCase):
         aaphoto_deps = ["libc6", "libgomp1", "libjasper1", "libjpeg62",
                         "libpng12-0"]
         libc6_deps = ["libc-bin", "libgcc1"]
+        self.build_dependency_graph({"aaphoto": aaphoto_deps,
+                                     "libc6": libc6_deps})
 
         for pkg in aaphoto_deps + libc6_deps:
             self.user.item_score[pkg] = 1
@@ -140,27 +182,89 @@ class UserTests(unittest.TestCase):
         self.assertEqual(old_pkg_profile, self.user.maximal_pkg_profile())
 
 
+def legacy_eliminate_duplicated(sorted_list, size):
+    profile = sorted_list[:size]
+    next_index = size
+    duplicate = 1
+    while duplicate:
+        duplicate = 0
+        for term in profile[:]:
+            if term.startswith("Z"):
+                for p in profile[:]:
+                    if p.startswith(term.lstrip("Z")):
+                        duplicate = 1
+                        profile.remove(p)
+                        if len(sorted_list) > next_index:
+                            profile.append(sorted_list[next_index])
+                        next_index += 1
+    return profile
+
+
+class EliminateDuplicatedTests(unittest.TestCase):
+
+    def setUp(self):
+        self.user = User({}, installed_pkgs=set())
+
+    def assert_same_profile(self, sorted_list, size):
+        self.assertEqual(legacy_eliminate_duplicated(sorted_list, size),
+                         self.user._eliminate_duplicated(sorted_list, size))
+
+    def test_stemmed_terms(self):
+        sorted_list = ["editor", "Zedit", "XTuse::editing", "edition",
+                       "image", "Zimag", "imaging", "Zview", "viewer", "text",
+                       "texts", "Ztext", "graphics"]
+
+        for size in range(len(sorted_list) + 2):
+            self.assert_same_profile(sorted_list, size)
+
+        self.assertEqual(["Zedit", "XTuse::editing", "Zimag", "Zview"],
+                         self.user._eliminate_duplicated(sorted_list, 4))
+
+    def test_random_profiles(self):
+        rand = random.Random(42)
+        terms = set()
+        while len(terms) < 60:
+            term = ''.join(rand.choice('abc')
+                           for _ in range(rand.randint(1, 4)))
+            terms.add(rand.choice(['', '', 'Z', 'XT']) + term)
+        terms = sorted(terms)
+
+        for _ in range(300):
+            sorted_list = rand.sample(terms, rand.randint(0, len(terms)))
+            self.assert_same_profile(sorted_list, rand.randint(0, 30))
+
+
 class LocalSystemTest(unittest.TestCase):
 
     def setUp(self):
         self.user = LocalSystem()
 
-    @patch('commands.getoutput')
-    @patch('glob.glob', return_value=['test'])
-    def test_get_apt_installed_pkgs(self, mock_glob, mock_command):
-        mock_command.return_value = 'Commandline: apt install test1 test2\n'
-        apt_pkgs = self.user.get_apt_installed_pkgs()
+    def get_apt_installed_pkgs(self, history):
+        history_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, history_dir)
+
+        with open(os.path.join(history_dir, 'history.log'), 'w') as log:
+            log.write(history)
+
+        with patch('apprecommender.apt_history.AptHistoryIndex.HISTORY_GLOB',
+                   os.path.join(history_dir, 'history.log*')), \
+                patch('apprecommender.apt_history.Config') as mock_config:
+            mock_config.return_value.user_data_dir = history_dir
+            return self.user.get_apt_installed_pkgs()
+
+    def test_get_apt_installed_pkgs(self):
+        apt_pkgs = self.get_apt_installed_pkgs(
+            'Commandline: apt install test1 test2\n')
 
         self.assertEqual(2, len(apt_pkgs))
         self.assertIn('test1', apt_pkgs)
         self.assertIn('test2', apt_pkgs)
 
-        mock_command.return_value = 'Commandline: apt remove test1 test2\n'
-        apt_pkgs = self.user.get_apt_installed_pkgs()
+        apt_pkgs = self.get_apt_installed_pkgs(
+            'Commandline: apt remove test1 test2\n')
 
         self.assertEqual(0, len(apt_pkgs))
 
-        mock_command.return_value = 'Commandline: apt upgrade\n'
-        apt_pkgs = self.user.get_apt_installed_pkgs()
+        apt_pkgs = self.get_apt_installed_pkgs('Commandline: apt upgrade\n')
 
         self.assertEqual(0, len(apt_pkgs))
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+import threading
+import unittest
+import xapian
+
+from mock import MagicMock, patch
+
+from apprecommender.xapian_index import XapianIndexManager
+
+
+def create_index(uuid='uuid', revision=1):
+    index = MagicMock()
+    index.get_uuid.return_value = uuid
+    index.get_revision.return_value = revision
+    return index
+
+
+class XapianIndexManagerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = XapianIndexManager()
+        self.manager.local = threading.local()
+        self.manager.open_counts.clear()
+        self.manager.reopen_events.clear()
+        self.manager.check_interval = 0
+
+    def tearDown(self):
+        self.manager.local = threading.local()
+        self.manager.open_counts.clear()
+        self.manager.reopen_events.clear()
+        self.manager.check_interval = XapianIndexManager.CHECK_INTERVAL
+
+    @patch('apprecommender.xapian_index.xapian.Database')
+    def test_open_once(self, mock_database):
+        mock_database.return_value = create_index()
+
+        index = self.manager.get('/index')
+        self.assertIs(index, self.manager.get('/index'))
+
+        self.assertEqual({'/index': 1},
+                         self.manager.get_stats()['open_counts'])
+        self.assertEqual([], self.manager.get_stats()['reopen_events'])
+
+    @patch('apprecommender.xapian_index.xapian.Database')
+    def test_reopen_new_revision(self, mock_database):
+        index = create_index()
+        mock_database.return_value = index
+        self.manager.get('/index')
+
+        index.get_revision.return_value = 2
+        self.assertIs(index, self.manager.get('/index'))
+
+        events = self.manager.get_stats()['reopen_events']
+        self.assertEqual(1, len(events))
+        self.assertEqual(('uuid', 1), events[0].old_version)
+        self.assertEqual(('uuid', 2), events[0].new_version)
+
+    @patch('apprecommender.xapian_index.xapian.Database')
+    def test_open_replaced_index(self, mock_database):
+        index, new_index = create_index(), create_index('new_uuid')
+        mock_database.side_effect = [index, new_index]
+        index.reopen.side_effect = xapian.DatabaseError('replaced')
+
+        self.manager.get('/index')
+        self.assertIs(new_index, self.manager.get('/index'))
+
+        stats = self.manager.get_stats()
+        self.assertEqual({'/index': 2}, stats['open_counts'])
+        self.assertEqual(('new_uuid', 1), stats['reopen_events'][0][3])
+
+    @patch('apprecommender.xapian_index.xapian.Database')
+    def test_handle_per_thread(self, mock_database):
+        mock_database.side_effect = lambda path: create_index()
+        index = self.manager.get('/index')
+
+        handles = []
+        thread = threading.Thread(
+            target=lambda: handles.append(self.manager.get('/index')))
+        thread.start()
+        thread.join()
+
+        self.assertIsNot(index, handles[0])
+        self.assertEqual({'/index': 2},
+                         self.manager.get_stats()['open_counts'])
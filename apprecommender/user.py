@@ -20,9 +20,7 @@ __license__ = """
     along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-import commands
 import datetime
-import glob
 import logging
 import os
 import pickle
@@ -32,12 +30,16 @@ import xapian
 
 import apprecommender.data as data
 
-from apprecommender.apt_cache import AptCache
+from apprecommender.apt_history import AptHistoryIndex
 from apprecommender.config import Config
-from apprecommender.decider import (FilterTag, FilterDescription,
+from apprecommender.decider import (FilterAny, FilterTag, FilterDescription,
                                     FilterTag_or_Description)
+from apprecommender.dependency_graph import DependencyGraph
+from apprecommender.dpkg_status import DpkgStatus
 from apprecommender.error import Error
+from apprecommender.profile_cache import ProfileCache
 from apprecommender.singleton import Singleton
+from apprecommender.term_matrix import PkgTermMatrix
 
 
 class DemographicProfile(Singleton):
@@ -67,22 +69,43 @@ class DemographicProfile(Singleton):
         return demographic_profile
 
 
-class User:
+class User(object):
 
     """
     Define a user of a recommender.
     """
 
+    ML_CONTENTS = set(['mlbow_mix', 'mlbva_mix', 'mlbow_mix_eset',
+                       'mlbva_mix_eset'])
+
+    # Weighting method and term filters used by every content type. When
+    # more than one filter is used, the profile takes half of the terms of
+    # each of them.
+    CONTENT_FILTERS = {'tag': ('tfidf', ('tag',)),
+                       'desc': ('tfidf', ('desc',)),
+                       'mix': ('tfidf', ('mix',)),
+                       'mlbow_mix': ('tfidf', ('mix',)),
+                       'mlbva_mix': ('tfidf', ('mix',)),
+                       'half': ('tfidf', ('tag', 'desc')),
+                       'time': ('tfidf', ('tag', 'desc')),
+                       'tag_eset': ('eset', ('tag',)),
+                       'desc_eset': ('eset', ('desc',)),
+                       'mix_eset': ('eset', ('mix',)),
+                       'mlbow_mix_eset': ('eset', ('mix',)),
+                       'mlbva_mix_eset': ('eset', ('mix',)),
+                       'half_eset': ('eset', ('tag', 'desc'))}
+
     def __init__(self, item_score, user_id=0, arch=0, demo_profiles_set=0,
-                 reference_pkgs=None):
+                 reference_pkgs=None, installed_pkgs=None):
         """
         Set initial user attributes. pkg_profile gets the whole set of items,
         a random user_id is set if none was provided and the demographic
-        profile defaults to 'desktop'.
+        profile defaults to 'desktop'. If installed_pkgs is not provided, the
+        packages installed on the local system are loaded on first use.
         """
         self.item_score = item_score
         self.pkg_profile = self.items()
-        self.installed_pkgs = data.get_user_installed_pkgs()
+        self._installed_pkgs = installed_pkgs
         self.arch = arch
 
         self.reference_pkgs = reference_pkgs if reference_pkgs else []
@@ -93,9 +116,31 @@ class User:
             random.seed()
             self.id = random.getrandbits(128)
 
-        if not demo_profiles_set:
-            profiles_set = set(["desktop"])
-        self.set_demographic_profile(profiles_set)
+        self.demo_profiles_set = demo_profiles_set or set(["desktop"])
+        self._demographic_profile = None
+
+    @property
+    def installed_pkgs(self):
+        if self._installed_pkgs is None:
+            self._installed_pkgs = data.get_user_installed_pkgs()
+
+        return self._installed_pkgs
+
+    @installed_pkgs.setter
+    def installed_pkgs(self, installed_pkgs):
+        self._installed_pkgs = installed_pkgs
+
+    @property
+    def demographic_profile(self):
+        if self._demographic_profile is None:
+            self._demographic_profile = DemographicProfile()(
+                self.demo_profiles_set)
+
+        return self._demographic_profile
+
+    @demographic_profile.setter
+    def demographic_profile(self, demographic_profile):
+        self._demographic_profile = demographic_profile
 
     def items(self):
         """
@@ -113,115 +158,196 @@ class User:
                         time_context=0):
         """
         Get user profile for a specific type of content: packages tags,
-        description or both (mixed and half-half profiles)
+        description or both (mixed and half-half profiles). Profiles are
+        cached across runs, except the time ones, which depend on the
+        packages usage.
         """
-        if content == "tag":
-            profile = self.tfidf_profile(items_repository, size,
-                                         FilterTag(valid_tags), time_context)
-        elif content == "desc":
-            profile = self.tfidf_profile(items_repository,
-                                         size, FilterDescription(),
-                                         time_context)
-        elif content == 'mlbow_mix' or content == 'mlbva_mix':
+        if content in User.ML_CONTENTS:
             self.pkg_profile = self.get_most_usefull_pkgs()
-            profile = self.tfidf_profile(items_repository, size,
-                                         FilterTag_or_Description(valid_tags),
-                                         time_context)
-        elif content == "mix":
-            profile = self.tfidf_profile(items_repository, size,
-                                         FilterTag_or_Description(valid_tags),
-                                         time_context)
-        elif content == "half":
-            tag_profile = self.tfidf_profile(items_repository, size,
-                                             FilterTag(valid_tags),
-                                             time_context)
-            desc_profile = self.tfidf_profile(items_repository, size,
-                                              FilterDescription(),
-                                              time_context)
-            profile = tag_profile[:size / 2] + desc_profile[:size / 2]
-        elif content == "time":
-            tag_profile = self.tfidf_profile(items_repository, size,
-                                             FilterTag(valid_tags),
-                                             time_context=1)
-            desc_profile = self.tfidf_profile(items_repository, size,
-                                              FilterDescription(),
-                                              time_context=1)
-            profile = tag_profile[:size / 2] + desc_profile[:size / 2]
-        elif content == "tag_eset":
-            profile = self.eset_profile(items_repository, size,
-                                        FilterTag(valid_tags))
-        elif content == "desc_eset":
-            profile = self.eset_profile(items_repository, size,
-                                        FilterDescription())
-        elif content == 'mlbow_mix_eset' or content == 'mlbva_mix_eset':
-            self.pkg_profile = self.get_most_usefull_pkgs()
-            profile = self.eset_profile(items_repository, size,
-                                        FilterTag_or_Description(valid_tags))
-        elif content == "mix_eset":
-            profile = self.eset_profile(items_repository, size,
-                                        FilterTag_or_Description(valid_tags))
-        elif content == "half_eset":
-            tag_profile = self.eset_profile(items_repository, size,
-                                            FilterTag(valid_tags))
-            desc_profile = self.eset_profile(items_repository, size,
-                                             FilterDescription())
-            profile = tag_profile[:size / 2] + desc_profile[:size / 2]
+
+        if content == "time" or time_context:
+            return self.compute_content_profile(items_repository, content,
+                                                size, valid_tags, time_context)
+
+        profile_cache = ProfileCache()
+        key = ProfileCache.get_key(items_repository, self.pkg_profile, content,
+                                   size, valid_tags)
+
+        profile = profile_cache.get(key)
+        if profile is None:
+            profile = self.compute_content_profile(
+                items_repository, content, size, valid_tags, time_context)
+            profile_cache.set(key, profile)
         else:
+            logging.debug("User %s profile loaded from cache" % content)
+
+        return profile
+
+    def compute_content_profile(self, items_repository, content, size,
+                                valid_tags=0, time_context=0):
+        if content not in User.CONTENT_FILTERS:
             logging.debug("Unknown content type %s." % content)
             raise Error
+
+        weighting, filters_names = User.CONTENT_FILTERS[content]
+        classification = PkgTermMatrix.get_classification(items_repository,
+                                                          valid_tags)
+        content_filters = dict(
+            (name, User.get_content_filter(name, valid_tags, classification))
+            for name in filters_names)
+
+        if weighting == 'eset':
+            profiles = self.eset_profiles(items_repository, size,
+                                          content_filters)
+        else:
+            if content == 'time':
+                time_context = 1
+            profiles = self.tfidf_profiles(items_repository, size,
+                                           content_filters, time_context)
+
+        if len(filters_names) == 1:
+            profile = profiles[filters_names[0]]
+        else:
+            profile = []
+            for name in filters_names:
+                profile += profiles[name][:size / len(filters_names)]
+
         logging.debug("User %s profile: %s" % (content, profile))
         return profile
 
+    @staticmethod
+    def get_content_filter(name, valid_tags=0, classification=None):
+        if name == 'tag':
+            return FilterTag(valid_tags, classification)
+        elif name == 'desc':
+            return FilterDescription(classification)
+        return FilterTag_or_Description(valid_tags, classification)
+
     def tfidf_profile(self, items_repository, size, content_filter,
                       time_context=0):
         """
         Return the most relevant tags for the user list of packages based on
         the sublinear tfidf weight of packages' tags.
         """
+        return self.tfidf_profiles(items_repository, size,
+                                   {None: content_filter}, time_context)[None]
 
+    def tfidf_profiles(self, items_repository, size, content_filters,
+                       time_context=0):
+        """
+        Return a dict with the tfidf profile of every filter of
+        content_filters, weighting the terms of the user packages once.
+        """
         docs = data.axi_search_pkgs(items_repository, self.pkg_profile)
-        # weights = data.tfidf_plus(items_repository,docs,content_filter)
-        weights = data.tfidf_weighting(items_repository, docs, content_filter,
-                                       time_context=time_context)
-        # Eliminate duplicated stemmed term
-        profile = self._eliminate_duplicated([w[0] for w in weights], size)
-        return profile
+        limit = size * 2
+        filters_weights = data.tfidf_weighting_by_filter(
+            items_repository, docs, content_filters,
+            time_context=time_context, limit=limit)
+
+        profiles = {}
+        for name, weights in filters_weights.iteritems():
+            # Eliminate duplicated stemmed term
+            profile = self._eliminate_duplicated([w[0] for w in weights],
+                                                 size)
+
+            # Only the best terms were sorted, which is not enough if too
+            # many duplicated terms were found
+            if len(profile) < size and len(weights) == limit:
+                weights = data.tfidf_weighting(items_repository, docs,
+                                               content_filters[name],
+                                               time_context=time_context)
+                profile = self._eliminate_duplicated(
+                    [w[0] for w in weights], size)
+
+            profiles[name] = profile
+
+        return profiles
 
     def eset_profile(self, items_repository, size, content_filter):
         """
         Return most relevant tags for a list of packages.
         """
+        return self.eset_profiles(items_repository, size,
+                                  {None: content_filter})[None]
+
+    def eset_profiles(self, items_repository, size, content_filters):
+        """
+        Return a dict with the eset profile of every filter of
+        content_filters. A single eset is expanded with the terms accepted by
+        any filter and then split by filter.
+        """
         # Store package documents in a relevant set
         enquire = xapian.Enquire(items_repository)
         docs = data.axi_search_pkgs(items_repository, self.pkg_profile)
         rset_packages = xapian.RSet()
         for d in docs:
             rset_packages.add_document(d.docid)
-        # Get expanded query terms (statistically good differentiators)
-        eset_tags = enquire.get_eset(size * 2, rset_packages,
-                                     xapian.Enquire.INCLUDE_QUERY_TERMS,
-                                     1, content_filter)
+
+        content_filter = FilterAny(content_filters)
+        expand_decider = content_filter.get_expand_decider()
+        limit = size * 2
+        eset_size = limit * len(content_filters)
+
+        # Get expanded query terms (statistically good differentiators),
+        # until every filter has its best terms or all terms were expanded
+        while True:
+            eset_terms = [res.term for res in enquire.get_eset(
+                eset_size, rset_packages, xapian.Enquire.INCLUDE_QUERY_TERMS,
+                1, expand_decider)]
+
+            filters_terms = {}
+            for name in content_filters:
+                filters_terms[name] = [
+                    term for term in eset_terms
+                    if name in content_filter.get_filters(term)][:limit]
+
+            if (len(eset_terms) < eset_size or
+                    all(len(terms) == limit
+                        for terms in filters_terms.itervalues())):
+                break
+            eset_size *= 2
+
         # Eliminate duplicated stemmed term
-        profile = self._eliminate_duplicated([res.term for res in eset_tags],
-                                             size)
-        return profile
+        return dict((name, self._eliminate_duplicated(terms, size))
+                    for name, terms in filters_terms.iteritems())
 
     def _eliminate_duplicated(self, sorted_list, size):
-        profile = sorted_list[:size]
-        next_index = size
-        duplicate = 1
-        while duplicate:
-            duplicate = 0
-            for term in profile[:]:
-                if term.startswith("Z"):
-                    for p in profile[:]:
-                        if p.startswith(term.lstrip("Z")):
-                            duplicate = 1
-                            profile.remove(p)
-                            if len(sorted_list) > next_index:
-                                profile.append(sorted_list[next_index])
-                            next_index += 1
-        return profile
+        """
+        Return the best size terms of sorted_list that are not duplicated by
+        a stemmed term, that is, which do not start with the stem of a "Z"
+        term kept before them or replacing one of them on the profile.
+
+        Terms are indexed by their prefixes, so every term is only looked
+        up once instead of rescanning the profile until nothing changes.
+        """
+        stems = set()
+        terms_by_prefix = {}
+        kept = [False] * len(sorted_list)
+        num_kept = 0
+
+        for index, term in enumerate(sorted_list):
+            if index >= size and num_kept == size:
+                break
+
+            stem = term.lstrip("Z") if term.startswith("Z") else None
+
+            if stem:
+                stems.add(stem)
+                for duplicated in terms_by_prefix.pop(stem, []):
+                    if kept[duplicated]:
+                        kept[duplicated] = False
+                        num_kept -= 1
+            elif any(term[:i] in stems for i in range(1, len(term) + 1)):
+                continue
+
+            kept[index] = True
+            num_kept += 1
+
+            if not stem:
+                for i in range(1, len(term) + 1):
+                    terms_by_prefix.setdefault(term[:i], []).append(index)
+
+        return [term for index, term in enumerate(sorted_list) if kept[index]]
 
     def filter_pkg_profile(self, filter_list_or_file):
         """
@@ -257,18 +383,12 @@ class User:
         Return list of packages that are not dependence of any other package in
         the list.
         """
-        cache = AptCache()
         old_profile_size = len(self.pkg_profile)
 
-        for p in self.pkg_profile[:]:  # iterate list copy
-            if p in cache:
-                pkg = cache[p]
-
-                if pkg.candidate:
-                    for dep in pkg.candidate.dependencies:
-                        for or_dep in dep.or_dependencies:
-                            if or_dep.name in self.pkg_profile:
-                                self.pkg_profile.remove(or_dep.name)
+        dependencies = DependencyGraph.get().get_or_dependencies(
+            self.pkg_profile)
+        self.pkg_profile = [pkg for pkg in self.pkg_profile
+                            if pkg not in dependencies]
 
         profile_size = len(self.pkg_profile)
         logging.debug("Maximal package profile: reduced packages profile size \
@@ -316,7 +436,8 @@ class RandomPopcon(User):
             print "p", len_profile
         submission = data.PopconSubmission(path)
         User.__init__(self, submission.packages, submission.user_id,
-                      submission.arch)
+                      submission.arch,
+                      installed_pkgs=set(submission.packages))
 
 
 class PopconSystem(User):
@@ -328,7 +449,8 @@ class PopconSystem(User):
         submission = data.PopconSubmission(path)
         if not user_id:
             user_id = submission.user_id
-        User.__init__(self, submission.packages, user_id, submission.arch)
+        User.__init__(self, submission.packages, user_id, submission.arch,
+                      installed_pkgs=set(submission.packages))
 
 
 class LocalSystem(User):
@@ -350,64 +472,13 @@ class LocalSystem(User):
         User.__init__(self, item_score, reference_pkgs=reference_pkgs)
 
     def get_system_pkgs(self):
-        system_pkgs = []
-        all_pkgs = commands.getoutput("dpkg-query -Wf \
-                                      '${Package;-40}${Priority}\n'")
-
-        priority_terms = set(['important', 'required', 'standard'])
-
-        for line in all_pkgs.splitlines():
-            line_split = line.split(' ')
-            pkg_name = line_split[0]
-            pkg_priority = line_split[-1].strip()
-
-            if (pkg_priority in priority_terms):
-                system_pkgs.append(pkg_name)
-
-        return system_pkgs
+        return DpkgStatus().get_priority_pkgs()
 
     def get_apt_installed_pkgs(self):
-        apt_pkgs = set()
-        apt_log = glob.glob('/var/log/apt/history.log*')
-
-        installed_pkgs_regex = re.compile(
-            r'^Commandline:.+apt.+install\s(.+)', re.MULTILINE)
-        no_remove_pkgs_regex = re.compile(r'--no-remove')
-        automatic_remove_regex = re.compile(r'APT::Get::AutomaticRemove=true')
-
-        apt_log = reversed(sorted(apt_log))
-        for log in apt_log:
-            command = 'zcat' if log.endswith('gz') else 'cat'
-            history_files = commands.getoutput(
-                '{} {} | grep "Commandline:"'.format(command, log))
-
-            '''
-            The log_files will hold packages with this format:
-
-            Commandline: apt install google-chrome-stable
-
-            Therefore it is necessary to perform another filter on it
-            to only get the package name.
-            '''
-
-            for apt_command in history_files.splitlines():
-                installed_pkgs = installed_pkgs_regex.search(apt_command)
-                no_remove_pkgs = no_remove_pkgs_regex.search(apt_command)
-                automatic_remove_pkgs = automatic_remove_regex.search(
-                    apt_command)
-
-                if (installed_pkgs and not no_remove_pkgs and not
-                        automatic_remove_pkgs):
-                    pkgs = set(installed_pkgs.group(1).split())
-                    apt_pkgs |= pkgs
-
-        return apt_pkgs
+        return AptHistoryIndex().get_installed_pkgs()
 
     def __get_manual_marked_pkgs(self):
-        list_manual = commands.getoutput('apt-mark showmanual')
-        list_manual = list_manual.splitlines()
-
-        return set([pkg for pkg in list_manual])
+        return DpkgStatus().get_manual_pkgs()
 
     def __remove_lib_packages(self, pkgs):
         return set([pkg for pkg in pkgs if not re.match(r'^lib', pkg)])
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+import collections
+import logging
+import os
+import threading
+import time
+
+import xapian
+
+from apprecommender.singleton import Singleton
+
+ReopenEvent = collections.namedtuple(
+    'ReopenEvent', 'time path old_version new_version')
+
+
+class XapianIndexManager(Singleton):
+
+    """
+    Shared read handles of the xapian indexes. Each index is opened once
+    per thread, as xapian handles must not be shared between threads, and
+    reopened when its revision or uuid changes, as after it is rebuilt by
+    --init. Open counts and reopen events are kept for monitoring.
+    """
+
+    CHECK_INTERVAL = 1.0
+    MAX_EVENTS = 100
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            self.lock = threading.Lock()
+            self.local = threading.local()
+            self.check_interval = XapianIndexManager.CHECK_INTERVAL
+            self.open_counts = collections.Counter()
+            self.reopen_events = collections.deque(
+                maxlen=XapianIndexManager.MAX_EVENTS)
+            self.initialized = 1
+
+    @staticmethod
+    def get_version(index):
+        return index.get_uuid(), index.get_revision()
+
+    def get_handles(self):
+        if not hasattr(self.local, 'handles'):
+            self.local.handles = {}
+
+        return self.local.handles
+
+    def open(self, path):
+        index = xapian.Database(path)
+
+        with self.lock:
+            self.open_counts[path] += 1
+
+        return index
+
+    def reopen(self, path, index):
+        """
+        Return index updated to the last revision on path, or a new handle
+        if the index was replaced.
+        """
+        try:
+            index.reopen()
+        except xapian.DatabaseError:
+            index = self.open(path)
+
+        return index
+
+    def get(self, path):
+        """
+        Return the read handle of the index on path for the current thread.
+        Opened handles are checked for a new revision at most once every
+        check_interval seconds.
+        """
+        path = os.path.expanduser(path)
+        handles = self.get_handles()
+        now = time.time()
+
+        if path not in handles:
+            index = self.open(path)
+            handles[path] = [index, self.get_version(index), now]
+            return index
+
+        handle = handles[path]
+        index, version, checked = handle
+        if now - checked < self.check_interval:
+            return index
+
+        index = self.reopen(path, index)
+        new_version = self.get_version(index)
+        if new_version != version:
+            logging.info("Xapian index %s reopened at revision %s" %
+                         (path, new_version[1]))
+            with self.lock:
+                self.reopen_events.append(
+                    ReopenEvent(now, path, version, new_version))
+
+        handle[:] = [index, new_version, now]
+        return index
+
+    def close(self, path):
+        """
+        Drop the handle of the index on path of the current thread.
+        """
+        self.get_handles().pop(os.path.expanduser(path), None)
+
+    def get_stats(self):
+        """
+        Return the number of times each index was opened and the last
+        reopen events.
+        """
+        with self.lock:
+            return {'open_counts': dict(self.open_counts),
+                    'reopen_events': list(self.reopen_events)}